@@ -82,6 +82,10 @@ class Basereleaser:
             self.zest_releaser_config = pypi.ZestReleaserConfig()
         if self.zest_releaser_config.no_input():
             utils.AUTO_RESPONSE = True
+        utils.set_known_warnings(self.zest_releaser_config.known_warnings())
+        utils.PYTHONPATH_FOR_ALL_COMMANDS = (
+            self.zest_releaser_config.pythonpath_for_all_commands()
+        )
 
     @property
     def history_format(self):
@@ -387,23 +391,69 @@ class Basereleaser:
             else:
                 commit_msg = self.data["commit_msg"]
 
-        diff_cmd = self.vcs.cmd_diff()
+        paths = self._commit_paths()
+        diff_cmd = self.vcs.cmd_diff(paths=paths)
         diff = execute_command(diff_cmd)
         logger.info("The '%s':\n\n%s\n", utils.format_command(diff_cmd), diff)
         if utils.ask("OK to commit this"):
             msg = commit_msg % self.data
             msg = self.update_commit_message(msg)
-            commit_cmd = self.vcs.cmd_commit(msg)
+            commit_cmd = self.vcs.cmd_commit(msg, paths=paths)
             commit = execute_command(commit_cmd)
             logger.info(commit)
+            utils.forget_written_files()
+
+    def _commit_paths(self):
+        """Return the files to diff and commit, or None for all changes.
 
-    def _push(self):
-        """Offer to push changes, if needed."""
-        push_cmds = self.vcs.push_commands()
+        These are the files that we have written.  Looking at only these
+        files is faster in a big repository, and does not commit unrelated
+        changes.  When a hook may have written other files, or when one of
+        the files is not in version control yet, we look at all changes.
+        Files outside of the repository, like in the tag checkout, are
+        ignored.
+        """
+        written = utils.written_files()
+        if not written:
+            return None
+        reporoot = os.path.realpath(self.vcs.reporoot)
+        paths = []
+        for filename in written:
+            realpath = os.path.realpath(filename)
+            try:
+                if os.path.commonpath([reporoot, realpath]) != reporoot:
+                    continue
+            except ValueError:
+                # On Windows: a different drive.
+                continue
+            paths.append(os.path.relpath(filename))
+        if not paths:
+            return None
+        tracked = {os.path.normpath(path) for path in self.vcs.list_files()}
+        if any(os.path.normpath(path) not in tracked for path in paths):
+            return None
+        return paths
+
+    def _push(self, tags=None):
+        """Offer to push changes, if needed.
+
+        Pass the tags that we have made, if any.
+        """
+        push_cmds = self.vcs.push_commands(tags=tags)
         if not push_cmds:
             return
         default_anwer = self.zest_releaser_config.push_changes()
         if utils.ask("OK to push commits to the server?", default=default_anwer):
+            fallback_cmds = self.vcs.push_fallback_commands(tags=tags)
+            if fallback_cmds and not utils.TESTMODE:
+                # Try the first command once, without asking questions.
+                output = execute_command(push_cmds[0], check=False)
+                if not utils.has_exit_code(output):
+                    logger.info(output)
+                    return
+                print(output)
+                logger.warning("Push failed, pushing the branch and tags separately.")
+                push_cmds = fallback_cmds
             for push_cmd in push_cmds:
                 if utils.TESTMODE:
                     logger.info("MOCK push command: %s", push_cmd)
@@ -420,11 +470,12 @@ class Basereleaser:
         utils.run_hooks(self.zest_releaser_config, which_releaser, when, self.data)
 
     def run(self):
-        self._run_hooks("before")
-        self.prepare()
-        self._run_hooks("middle")
-        self.execute()
-        self._run_hooks("after")
+        with utils.command_cache():
+            self._run_hooks("before")
+            self.prepare()
+            self._run_hooks("middle")
+            self.execute()
+            self._run_hooks("after")
 
     def prepare(self):
         raise NotImplementedError()
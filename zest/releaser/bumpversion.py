@@ -93,6 +93,8 @@ class BumpVersion(baserelease.Basereleaser):
             )
         else:
             print(f"Checking version bump for {self.data['release']} release.")
+        # Get the status, version and tags at the same time.
+        self.vcs.prefetch(tags=True)
         if not utils.sanity_check(self.vcs):
             logger.critical("Sanity check failed.")
             sys.exit(1)
@@ -133,12 +135,15 @@ class BumpVersion(baserelease.Basereleaser):
             rc = self.data["rc"]
             # Compare the suggestion for the last tag with the current version.
             # The wanted version bump may already have been done.
-            last_tag_version = utils.get_last_tag(self.vcs, allow_missing=True)
-            if last_tag_version is None:
+            last_tag = utils.get_last_tag(self.vcs, allow_missing=True)
+            if last_tag is None:
                 print("No tag found. No version bump needed.")
                 sys.exit(0)
             else:
-                print(f"Last tag: {last_tag_version}")
+                print(f"Last tag: {last_tag}")
+            last_tag_version = utils.version_from_tag(
+                last_tag, self.zest_releaser_config.tag_format_template()
+            )
             print(f"Current version: {original_version}")
             # Initially try without alpha/beta/rc.
             base_params = dict(
@@ -1,4 +1,5 @@
 from zest.releaser import git
+from zest.releaser import libgit
 from zest.releaser import utils
 
 import logging
@@ -28,7 +29,12 @@ def version_control():
         if ".git" in curdir_contents:
             if level != 0 and utils.ask(q, default=False):
                 os.chdir(path)
-            return git.Git(path)
+            vcs = git.Git(path)
+            if vcs.zest_releaser_config.git_backend() == "pygit2":
+                if libgit.is_available():
+                    return libgit.LibGit(path)
+                logger.warning("pygit2 is not installed, so we run git instead.")
+            return vcs
         # Get parent.
         newpath = os.path.abspath(os.path.join(path, os.pardir))
         if newpath == path:
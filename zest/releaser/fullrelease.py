@@ -17,18 +17,20 @@ def main():
     utils.configure_logging()
     logger.info("Starting prerelease.")
     original_dir = os.getcwd()
-    # prerelease
-    prereleaser = prerelease.Prereleaser()
-    prereleaser.run()
-    logger.info("Starting release.")
-    # release
-    releaser = release.Releaser(vcs=prereleaser.vcs)
-    releaser.run()
-    tagdir = releaser.data.get("tagdir")
-    logger.info("Starting postrelease.")
-    # postrelease
-    postreleaser = postrelease.Postreleaser(vcs=releaser.vcs)
-    postreleaser.run()
+    # Share the output of read-only commands between the three steps.
+    with utils.command_cache():
+        # prerelease
+        prereleaser = prerelease.Prereleaser()
+        prereleaser.run()
+        logger.info("Starting release.")
+        # release
+        releaser = release.Releaser(vcs=prereleaser.vcs)
+        releaser.run()
+        tagdir = releaser.data.get("tagdir")
+        logger.info("Starting postrelease.")
+        # postrelease
+        postreleaser = postrelease.Postreleaser(vcs=releaser.vcs)
+        postreleaser.run()
     os.chdir(original_dir)
     logger.info("Finished full release.")
     if tagdir:
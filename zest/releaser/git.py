@@ -1,15 +1,275 @@
+from zest.releaser import utils
+from zest.releaser.metadata import project_metadata
+from zest.releaser.utils import _execute_command
 from zest.releaser.utils import execute_command
 from zest.releaser.utils import fs_to_text
 from zest.releaser.vcs import BaseVersionControl
 
+import fnmatch
 import logging
 import os.path
+import pathlib
+import re
+import shutil
+import subprocess
 import sys
+import tarfile
 import tempfile
+import time
 
 
 logger = logging.getLogger(__name__)
 
+# Build requirements that need the git history or the files in git, so
+# they cannot work on an export of the tag.  Names are normalized.
+VCS_BUILD_PLUGINS = {
+    "dunamai",
+    "hatch-vcs",
+    "pbr",
+    "poetry-dynamic-versioning",
+    "setuptools-git",
+    "setuptools-git-versioning",
+    "setuptools-scm",
+    "versioningit",
+}
+# When a directory has changed less than this many nanoseconds before we
+# looked at it, it may change again without its modification time changing.
+RACY_NS = 2 * 10**9
+
+
+def find_git_dir(path):
+    """Return the git directory for this path, or None."""
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git) as f:
+                contents = f.read().strip()
+            if not contents.startswith("gitdir:"):
+                return None
+            return os.path.join(path, contents[len("gitdir:") :].strip())
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def common_git_dir(git_dir):
+    """Return the git directory that is shared by all worktrees."""
+    commondir_file = os.path.join(git_dir, "commondir")
+    if os.path.isfile(commondir_file):
+        with open(commondir_file) as f:
+            return os.path.join(git_dir, f.read().strip())
+    return git_dir
+
+
+def _has_commit(repo_dir, commit):
+    """Does the repository in this directory have this commit?"""
+    result = _execute_command(
+        ["git", "cat-file", "-e", f"{commit}^{{commit}}"], cwd=repo_dir
+    )
+    return not utils.has_exit_code(result)
+
+
+def _gitlinks(tree_listing):
+    """Return the path and commit of each submodule in ``ls-tree -z`` output.
+
+    Submodules are the entries with mode 160000.
+    """
+    for entry in tree_listing.split("\0"):
+        if not entry.startswith("160000 "):
+            continue
+        info, _, path = entry.partition("\t")
+        yield path, info.split()[2]
+
+
+def _has_export_attributes(repo_dir, treeish):
+    """Does git change files when it exports this treeish?
+
+    ``git archive`` leaves out files with the ``export-ignore`` attribute,
+    and fills in placeholders in files with ``export-subst``.  Then the
+    export is not the same as a checkout of the treeish.  We look for these
+    attributes in the ``.gitattributes`` files of the treeish, and in the
+    attributes file of the repository.
+    """
+    result = _execute_command(
+        ["git", "grep", "-l", "-E", "export-(ignore|subst)", treeish]
+        + ["--", ":(glob)**/.gitattributes"],
+        cwd=repo_dir,
+    )
+    if not utils.has_exit_code(result) and result.strip():
+        return True
+    result = _execute_command(
+        ["git", "rev-parse", "--git-path", "info/attributes"], cwd=repo_dir
+    )
+    if utils.has_exit_code(result) or not result.strip():
+        return False
+    info_attributes = os.path.join(repo_dir, result.strip())
+    if not os.path.isfile(info_attributes):
+        return False
+    with open(info_attributes, errors="replace") as f:
+        return re.search(r"export-(ignore|subst)", f.read()) is not None
+
+
+def _stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class CheckoutStatus:
+    """Status of a git checkout, from ``git status --porcelain=v2 --branch``.
+
+    - ``branch``: name of the current branch, or None for a detached head
+    - ``commit``: the current commit, or None in a new repository
+    - ``upstream``: the upstream branch, like ``origin/main``, or None
+    - ``ahead`` and ``behind``: number of commits compared to upstream
+    - ``dirty``: whether there are uncommitted changes in tracked files
+    """
+
+    def __init__(self, output):
+        self.branch = None
+        self.commit = None
+        self.upstream = None
+        self.ahead = 0
+        self.behind = 0
+        self.dirty = False
+        for line in output.splitlines():
+            if not line.startswith("# "):
+                if line.strip():
+                    self.dirty = True
+                continue
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            key, values = parts[1], parts[2:]
+            if key == "branch.oid" and values[0] != "(initial)":
+                self.commit = values[0]
+            elif key == "branch.head" and values[0] != "(detached)":
+                self.branch = values[0]
+            elif key == "branch.upstream":
+                self.upstream = values[0]
+            elif key == "branch.ab" and len(values) == 2:
+                self.ahead = int(values[0])
+                self.behind = -int(values[1])
+
+    @property
+    def detached(self):
+        return self.branch is None
+
+    def __repr__(self):
+        if self.detached:
+            where = "detached"
+        else:
+            where = self.branch
+        return f"<CheckoutStatus {where} dirty={self.dirty}>"
+
+
+class GitRefReader:
+    """Read the tags of a repository without running git.
+
+    Tags are stored in the ``packed-refs`` file and as loose files in
+    ``refs/tags/``.  We read both, and remember the result until one of
+    them changes.  In a worktree, the tags are in the common git directory
+    of the main repository.
+
+    Repositories with the newer reftable format are not supported:
+    ``tags`` returns None, and you should ask git instead.
+    """
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self.common_dir = common_git_dir(git_dir)
+        self.packed_refs = os.path.join(self.common_dir, "packed-refs")
+        self.tags_dir = os.path.join(self.common_dir, "refs", "tags")
+        # (packed-refs signature, tag names)
+        self._packed_cache = None
+        # (directories, their signatures, sorted tags, set of tags)
+        self._cache = None
+
+    def is_supported(self):
+        return not os.path.exists(os.path.join(self.common_dir, "reftable"))
+
+    def _packed_tags(self):
+        """Return the tag names in the packed-refs file."""
+        signature = _stat_signature(self.packed_refs)
+        if signature is None:
+            return set()
+        if self._packed_cache is not None and self._packed_cache[0] == signature:
+            return self._packed_cache[1]
+        tags = set()
+        with open(self.packed_refs, "rb") as f:
+            for line in f:
+                # Lines are '<sha> <refname>', or '^<sha>' for the commit
+                # that the previous tag points to, or a '#' comment.
+                if line.startswith((b"#", b"^")):
+                    continue
+                parts = line.rstrip(b"\n").split(b" ", 1)
+                if len(parts) != 2 or not parts[1].startswith(b"refs/tags/"):
+                    continue
+                tags.add(os.fsdecode(parts[1][len(b"refs/tags/") :]))
+        self._packed_cache = (signature, tags)
+        return tags
+
+    def _loose_tags(self, directory, prefix, tags, directories):
+        """Add the tag names from the files in this directory."""
+        directories.append(directory)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir():
+                self._loose_tags(
+                    entry.path, prefix + entry.name + "/", tags, directories
+                )
+            elif not entry.name.endswith(".lock"):
+                tags.add(prefix + entry.name)
+
+    def _signatures(self, directories):
+        return tuple(
+            _stat_signature(path) for path in [self.packed_refs] + directories
+        )
+
+    def _read(self):
+        if self._cache is not None:
+            directories, signatures, tags, tag_set = self._cache
+            if self._signatures(directories) == signatures:
+                return tags, tag_set
+        start = time.time_ns()
+        directories = []
+        tag_set = set(self._packed_tags())
+        self._loose_tags(self.tags_dir, "", tag_set, directories)
+        signatures = self._signatures(directories)
+        tags = sorted(tag_set)
+        tag_set = frozenset(tag_set)
+        if all(
+            signature is None or signature[0] < start - RACY_NS
+            for signature in signatures
+        ):
+            # Nothing changed just before we looked, so we can trust the
+            # modification times to tell us about the next change.
+            self._cache = (directories, signatures, tags, tag_set)
+        else:
+            self._cache = None
+        return tags, tag_set
+
+    def tags(self):
+        """Return a sorted list of tag names, or None if not supported."""
+        if not self.is_supported():
+            return None
+        return list(self._read()[0])
+
+    def tag_set(self):
+        """Return a frozenset of tag names, or None if not supported."""
+        if not self.is_supported():
+            return None
+        return self._read()[1]
+
 
 class Git(BaseVersionControl):
     """Command proxy for Git"""
@@ -17,6 +277,15 @@ class Git(BaseVersionControl):
     internal_filename = ".git"
     setuptools_helper_package = "setuptools-git"
 
+    def __init__(self, reporoot=None):
+        super().__init__(reporoot=reporoot)
+        # {git directory: GitRefReader}
+        self._ref_readers = {}
+        # Cached result of checkout_status: (key, status)
+        self._status_cache = None
+        # {checkout directory: submodules that we have checked out there}
+        self._updated_submodules = {}
+
     def is_setuptools_helper_package_installed(self):
         # The package is setuptools-git with a dash, the module is
         # setuptools_git with an underscore.  Thanks.
@@ -37,49 +306,360 @@ class Git(BaseVersionControl):
         dir_name = fs_to_text(dir_name)
         return dir_name
 
-    def available_tags(self):
-        tag_info = execute_command(["git", "tag"])
+    def clear_caches(self):
+        super().clear_caches()
+        self._ref_readers = {}
+        self._status_cache = None
+
+    def _ref_reader(self):
+        """Return a GitRefReader for the current repository, or None."""
+        if not self.zest_releaser_config.read_git_refs():
+            return None
+        git_dir = self._git_dir()
+        if git_dir is None:
+            return None
+        git_dir = os.path.abspath(git_dir)
+        reader = self._ref_readers.get(git_dir)
+        if reader is None:
+            reader = self._ref_readers[git_dir] = GitRefReader(git_dir)
+        if not reader.is_supported():
+            return None
+        return reader
+
+    def _prefetch_tags(self):
+        reader = self._ref_reader()
+        if reader is not None:
+            reader.tags()
+            return
+        # Run the command that get_last_tag runs, so the command cache has it.
+        tag_format = self.zest_releaser_config.tag_format_template()
+        self.available_tags(pattern=utils.tag_format_glob(tag_format))
+
+    def tag_exists(self, tag_name):
+        """Check if a tag has already been created with the name of the
+        version.
+        """
+        reader = self._ref_reader()
+        if reader is not None:
+            return tag_name in reader.tag_set()
+        # Look up this one ref, instead of listing all tags.
+        ref = "refs/tags/" + tag_name
+        refs = execute_command(["git", "for-each-ref", "--format=%(refname)", ref])
+        return ref in refs.splitlines()
+
+    def available_tags(self, pattern=None):
+        reader = self._ref_reader()
+        if reader is not None:
+            tags = reader.tags()
+            if pattern is not None:
+                tags = [tag for tag in tags if fnmatch.fnmatchcase(tag, pattern)]
+            logger.debug("Available tags: '%s'", ", ".join(tags))
+            return tags
+        cmd = ["git", "tag"]
+        if pattern is not None:
+            # Let git do the filtering.
+            cmd.extend(["--list", pattern])
+        tag_info = execute_command(cmd)
         tags = [line for line in tag_info.split("\n") if line]
         logger.debug("Available tags: '%s'", ", ".join(tags))
         return tags
 
+    def nearest_tag(self, pattern="*"):
+        """Return the nearest tag in the history of the current commit."""
+        result = _execute_command(
+            ["git", "describe", "--tags", "--abbrev=0", "--match", pattern]
+        )
+        if utils.has_exit_code(result):
+            logger.debug("No tag found with git describe: %s", result)
+            return None
+        return result.strip() or None
+
+    def _build_needs_vcs(self):
+        """Does building the package need version control information?
+
+        Plugins like setuptools-scm get the version or the list of files
+        from git.  We look at the build requirements in pyproject.toml,
+        and for older packages in setup.py and setup.cfg.
+        """
+        requirements = []
+        pyproject = project_metadata.pyproject_toml() or {}
+        requirements.extend(pyproject.get("build-system", {}).get("requires", []))
+        tool = pyproject.get("tool", {})
+        if "setuptools_scm" in tool or "setuptools-scm" in tool:
+            return True
+        if tool.get("hatch", {}).get("version", {}).get("source") == "vcs":
+            return True
+        if tool.get("pdm", {}).get("version", {}).get("source") == "scm":
+            return True
+        for filename in ("setup.py", "setup.cfg"):
+            if os.path.exists(filename):
+                with open(filename, errors="replace") as f:
+                    requirements.extend(re.findall(r"[\w.-]+", f.read()))
+        for requirement in requirements:
+            match = re.match(r"[\w.-]+", requirement)
+            if match is None:
+                continue
+            name = re.sub(r"[-_.]+", "-", match.group()).lower()
+            if name in VCS_BUILD_PLUGINS or name == "use-scm-version":
+                logger.debug("Building needs version control: %s", name)
+                return True
+        return False
+
+    def _use_archive(self):
+        strategy = self.zest_releaser_config.checkout_strategy()
+        if strategy == "auto":
+            return not self._build_needs_vcs()
+        return strategy == "archive"
+
+    def sparse_checkout_paths(self):
+        """Return the directories for a sparse tag checkout, or None.
+
+        This is the directory of the package, and the extra paths from the
+        ``sparse-checkout-paths`` option.  Files in the root of the
+        repository are always included.
+        """
+        if not self.zest_releaser_config.sparse_checkout():
+            return None
+        if self.relative_path_in_repo in ("", os.curdir):
+            return None
+        paths = [self.relative_path_in_repo.replace(os.sep, "/")]
+        paths.extend(self.zest_releaser_config.sparse_checkout_paths())
+        return paths
+
+    def _set_sparse_checkout(self, checkout_dir, paths):
+        cmd = ["git", "sparse-checkout", "set", "--cone"] + paths
+        logger.debug(execute_command(cmd, cwd=checkout_dir))
+
+    def _export_tree(self, repo_dir, treeish, target, paths=None):
+        """Extract the files of the treeish into the target directory.
+
+        We stream the output of ``git archive`` into tarfile, so no
+        temporary archive is written.  Submodules are not in the archive, so
+        we export them from their checkout in the original repository.
+        Return False when a submodule is not available there.
+
+        With paths, we only export these directories and the files in their
+        parent directories, like a sparse checkout in cone mode.
+
+        Return False when the treeish has attributes that make the export
+        differ from a checkout, see _has_export_attributes.
+        """
+        if _has_export_attributes(repo_dir, treeish):
+            logger.warning(
+                "%s in %s uses export-ignore or export-subst, so we do not "
+                "export it.",
+                treeish,
+                repo_dir,
+            )
+            return False
+        cmd = ["git", "archive", "--format=tar", treeish]
+        pathspec = []
+        if paths:
+            pathspec = ["--"] + paths
+            parents = {""}
+            for path in paths:
+                parts = path.split("/")[:-1]
+                for i in range(1, len(parts) + 1):
+                    parents.add("/".join(parts[:i]) + "/")
+            cmd += ["--"] + [f":(glob){parent}*" for parent in sorted(parents)]
+            cmd += paths
+        logger.debug("Running command: '%s' in %s", utils.format_command(cmd), repo_dir)
+        kwargs = {}
+        if hasattr(tarfile, "tar_filter"):
+            kwargs["filter"] = "tar"
+        # A pipe for stderr could fill up while we are reading stdout.
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                cmd, cwd=repo_dir, stdout=subprocess.PIPE, stderr=stderr
+            )
+            try:
+                with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+                    archive.extractall(target, **kwargs)
+            except (tarfile.TarError, OSError) as e:
+                logger.debug("Could not extract the archive: %s", e)
+                process.kill()
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+            if returncode:
+                stderr.seek(0)
+                print(utils.get_errors(utils.fs_to_text(stderr.read())))
+                logger.warning("Could not export %s from %s.", treeish, repo_dir)
+                return False
+        tree = _execute_command(
+            ["git", "ls-tree", "-r", "-z", treeish] + pathspec, cwd=repo_dir
+        )
+        if utils.has_exit_code(tree):
+            logger.warning("Could not list the files of %s.", treeish)
+            return False
+        for path, commit in _gitlinks(tree):
+            submodule_dir = os.path.join(repo_dir, path)
+            if not os.path.exists(os.path.join(submodule_dir, ".git")):
+                logger.warning("Submodule %s is not checked out.", path)
+                return False
+            if not _has_commit(submodule_dir, commit):
+                logger.warning("Submodule %s does not have commit %s.", path, commit)
+                return False
+            if not self._export_tree(
+                submodule_dir, commit, os.path.join(target, path)
+            ):
+                return False
+        return True
+
+    def export_tag(self, version, prefix):
+        """Export the files of the tag to a temporary directory.
+
+        Return the directory, or None when this is not possible.  There is
+        no .git directory in there.
+        """
+        temp = tempfile.mkdtemp(prefix=prefix)
+        exportdir = os.path.join(temp, "gitexport")
+        os.mkdir(exportdir)
+        logger.info("Exporting tag %s to %s", version, exportdir)
+        paths = self.sparse_checkout_paths()
+        if not self._export_tree(self.reporoot, version, exportdir, paths=paths):
+            shutil.rmtree(temp, ignore_errors=True)
+            return None
+        return exportdir
+
+    def checkout_from_tag(self, version):
+        if self._use_archive():
+            package = self.name
+            prefix = f"{package}-{version}-"
+            exportdir = self.export_tag(version, prefix)
+            if exportdir is not None:
+                os.chdir(exportdir)
+                return
+            logger.info("Could not export the tag, making a checkout instead.")
+        super().checkout_from_tag(version)
+
     def prepare_checkout_dir(self, prefix):
+        """Prepare a checkout in a temporary directory.
+
+        How we do this, depends on the ``checkout-strategy`` option.  With
+        ``shared`` and ``worktree`` we share the objects with the original
+        repository and do not check out any files yet: that only happens
+        for the tag in ``cmd_checkout_from_tag``.
+
+        With the ``sparse-checkout`` option, a ``clone`` is a partial clone,
+        which only gets the files that we check out, and we only check out
+        the directory of the package.  A ``shared`` clone is sparse too.
+        """
+        strategy = self.zest_releaser_config.checkout_strategy()
+        sparse_paths = self.sparse_checkout_paths()
         # Watch out: some git versions can't clone into an existing
         # directory, even when it is empty.
         temp = tempfile.mkdtemp(prefix=prefix)
+        clonedir = os.path.join(temp, "gitclone")
+        if strategy == "worktree":
+            cmd = ["git", "worktree", "add", "--detach", "--no-checkout", clonedir]
+            logger.debug(execute_command(cmd, cwd=self.reporoot))
+            return clonedir
         cwd = os.getcwd()
         os.chdir(temp)
+        if strategy == "shared":
+            cmd = [
+                "git",
+                "clone",
+                "--shared",
+                "--no-checkout",
+                self.reporoot,
+                "gitclone",
+            ]
+            logger.debug(execute_command(cmd))
+            os.chdir(cwd)
+            if sparse_paths:
+                self._set_sparse_checkout(clonedir, sparse_paths)
+            return clonedir
+        if sparse_paths:
+            # A partial clone needs a url.  The repository serves the
+            # missing files when we check them out, so it must allow this.
+            upload_pack = "git -c uploadpack.allowFilter=true upload-pack"
+            cmd = [
+                "git",
+                "clone",
+                "--filter=blob:none",
+                "--no-checkout",
+                "--upload-pack",
+                upload_pack,
+                "--config",
+                f"remote.origin.uploadpack={upload_pack}",
+                pathlib.Path(self.reporoot).as_uri(),
+                "gitclone",
+            ]
+            logger.debug(execute_command(cmd))
+            os.chdir(cwd)
+            self._set_sparse_checkout(clonedir, sparse_paths)
+            return clonedir
         cmd = ["git", "clone", "--depth", "1", self.reporoot, "gitclone"]
         logger.debug(execute_command(cmd))
-        clonedir = os.path.join(temp, "gitclone")
         os.chdir(clonedir)
-        cmd = ["git", "submodule", "update", "--init", "--recursive"]
-        logger.debug(execute_command(cmd))
+        submodules = self._submodule_state("HEAD")
+        if submodules is None or submodules:
+            for cmd in self.submodule_update_commands("HEAD", submodules):
+                logger.debug(execute_command(cmd))
+        self._updated_submodules[os.path.realpath(clonedir)] = submodules
         os.chdir(cwd)
         return clonedir
 
+    def cleanup_checkout_dir(self, checkout_dir):
+        """Remove the temporary checkout when it is a worktree.
+
+        A worktree is registered in the original repository, so we should
+        not leave it lying around.
+        """
+        if not checkout_dir:
+            return False
+        if self.zest_releaser_config.checkout_strategy() != "worktree":
+            return False
+        cmd = ["git", "worktree", "remove", "--force", checkout_dir]
+        logger.debug(execute_command(cmd, cwd=self.reporoot))
+        shutil.rmtree(os.path.dirname(checkout_dir), ignore_errors=True)
+        return True
+
     def tag_url(self, version):
         # this doesn't apply to Git, so we just return the
         # version name given ...
         return version
 
-    def cmd_diff(self):
+    def cmd_diff(self, paths=None):
+        if paths:
+            return ["git", "diff", "--"] + paths
         return ["git", "diff"]
 
-    def cmd_commit(self, message):
-        parts = ["git", "commit", "-a", "-m", message]
+    def cmd_commit(self, message, paths=None):
+        if paths:
+            parts = ["git", "commit", "-m", message]
+        else:
+            parts = ["git", "commit", "-a", "-m", message]
         if not self.zest_releaser_config.run_pre_commit():
             parts.append("-n")
+        if paths:
+            parts += ["--"] + paths
         return parts
 
-    def cmd_diff_last_commit_against_tag(self, version):
-        return ["git", "diff", version]
+    def cmd_diff_last_commit_against_tag(
+        self, version, stat=False, name_only=False, paths=None
+    ):
+        return self._with_diff_options(["git", "diff"], stat, name_only, paths, version)
 
-    def cmd_log_since_tag(self, version):
+    def cmd_log_since_tag(self, version, stat=False, name_only=False, paths=None):
         """Return log since a tagged version till the last commit of
         the working copy.
         """
-        return ["git", "log", "%s..HEAD" % version]
+        return self._with_diff_options(
+            ["git", "log"], stat, name_only, paths, "%s..HEAD" % version
+        )
+
+    def _with_diff_options(self, cmd, stat, name_only, paths, revisions):
+        if stat:
+            cmd.append("--stat")
+        if name_only:
+            cmd.append("--name-only")
+        cmd.append(revisions)
+        if paths:
+            cmd += ["--"] + paths
+        return cmd
 
     def cmd_create_tag(self, version, message, sign=False):
         cmd = ["git", "tag", version, "-m", message]
@@ -93,29 +673,243 @@ class Git(BaseVersionControl):
             # to work.
             logger.warning("We haven't been chdir'ed to %s", checkout_dir)
             sys.exit(1)
-        return [
-            ["git", "checkout", version],
-            ["git", "submodule", "update", "--init", "--recursive"],
+        cmds = [["git", "checkout", version]]
+        submodules = self._submodule_state(version)
+        if submodules is not None and not submodules:
+            logger.debug("No submodules in %s.", version)
+            return cmds
+        updated = self._updated_submodules.get(os.path.realpath(checkout_dir))
+        if submodules is not None and submodules == updated:
+            logger.debug("Submodules are already checked out for %s.", version)
+            return cmds
+        return cmds + self.submodule_update_commands(version, submodules)
+
+    def _submodule_state(self, revision):
+        """Return the submodules of the revision, as a tuple.
+
+        This has the path and commit of each submodule, and the object id
+        of the ``.gitmodules`` file.  When they are the same for two
+        revisions, the submodules are the same.  An empty tuple means there
+        are no submodules.  None means we could not find out.
+
+        We list the tree once, and only keep the submodules from it.
+        """
+        cmd = ["git", "ls-tree", "-r", "-z", "--full-tree", revision]
+        result = _execute_command(cmd)
+        if utils.has_exit_code(result):
+            return None
+        state = []
+        for entry in result.split("\0"):
+            info, _, path = entry.partition("\t")
+            if info.startswith("160000 ") or path == ".gitmodules":
+                state.append((path, info.split()[2]))
+        return tuple(state)
+
+    def _submodule_paths(self, revision):
+        """Return a dictionary with the path of each submodule by name."""
+        cmd = [
+            "git",
+            "config",
+            "--get-regexp",
+            "--blob",
+            f"{revision}:.gitmodules",
+            r"^submodule\..*\.path$",
         ]
+        result = _execute_command(cmd)
+        if utils.has_exit_code(result):
+            return {}
+        paths = {}
+        for line in result.splitlines():
+            key, _, path = line.partition(" ")
+            paths[key[len("submodule.") : -len(".path")]] = path
+        return paths
+
+    def submodule_update_commands(self, revision, submodules=None):
+        """Return the commands to check out the submodules of a revision.
+
+        Submodules that are already cloned in the original repository, with
+        the commit that the revision needs, are cloned from there, instead
+        of from their url.  The options ``submodule-jobs`` and
+        ``submodule-depth`` are passed on to git.
+
+        Pass the result of _submodule_state when you already have it.
+        """
+        cmds = []
+        jobs = self.zest_releaser_config.submodule_jobs()
+        depth = self.zest_releaser_config.submodule_depth()
+        options = []
+        if jobs:
+            options += ["--jobs", str(jobs)]
+        if depth:
+            options += ["--depth", str(depth)]
+        local_paths = []
+        git_dir = find_git_dir(self.reporoot)
+        if git_dir is not None:
+            modules_dir = os.path.join(common_git_dir(git_dir), "modules")
+            if submodules is None:
+                submodules = self._submodule_state(revision)
+            commits = dict(submodules or ())
+            for name, path in self._submodule_paths(revision).items():
+                module_dir = os.path.abspath(os.path.join(modules_dir, name))
+                commit = commits.get(path)
+                if not commit or not os.path.isdir(module_dir):
+                    continue
+                if not _has_commit(module_dir, commit):
+                    # An old clone: get the submodule from its url.
+                    continue
+                # Git ignores the depth for a local path, but not for a url.
+                url = pathlib.Path(module_dir).as_uri() if depth else module_dir
+                cmds.append(["git", "config", f"submodule.{name}.url", url])
+                local_paths.append(path)
+        if local_paths:
+            # Recent git versions only clone local submodules when allowed.
+            # Git passes this option on to nested submodules, so we only
+            # use it for the submodules that we clone from our own copy.
+            cmd = ["git", "-c", "protocol.file.allow=always", "submodule"]
+            cmd += ["update", "--init"] + options + ["--"] + local_paths
+            cmds.append(cmd)
+        cmds.append(["git", "submodule", "update", "--init", "--recursive"] + options)
+        return cmds
+
+    def _status_key(self):
+        """Return a key that changes when the status may have changed.
+
+        This changes when we have written files or run commands, and when
+        the git index or HEAD changes.
+        """
+        git_dir = self._git_dir()
+        if git_dir is None:
+            return None
+        return (
+            os.getcwd(),
+            utils.change_counter(),
+            _stat_signature(os.path.join(git_dir, "index")),
+            _stat_signature(os.path.join(git_dir, "HEAD")),
+        )
+
+    def checkout_status(self):
+        """Return the CheckoutStatus, with branch and dirty state.
+
+        We get all of it from one git command, and remember it until
+        something changes.  We do not look for untracked files.
+        """
+        key = self._status_key()
+        if key is not None and self._status_cache is not None:
+            cached_key = self._status_cache[0]
+            if cached_key == key:
+                return self._status_cache[1]
+            if cached_key[2:] != key[2:]:
+                # The index or HEAD has changed behind our back, for example
+                # by a commit.  The output of git commands that we remember
+                # may be outdated now too.
+                utils.mark_changed()
+        cmd = ["git"]
+        if self.zest_releaser_config.git_fsmonitor():
+            cmd.extend(["-c", "core.fsmonitor=true"])
+        cmd.extend(["status", "--porcelain=v2", "--branch", "--untracked-files=no"])
+        status = CheckoutStatus(execute_command(cmd))
+        # Git may have refreshed its index, so get the key again.
+        key = self._status_key()
+        if key is not None:
+            self._status_cache = (key, status)
+        return status
 
     def is_clean_checkout(self):
         """Is this a clean checkout?"""
-        head = execute_command(["git", "symbolic-ref", "--quiet", "HEAD"])
-        # This returns something like 'refs/heads/maurits-warn-on-tag'
-        # or nothing.  Nothing would be bad as that indicates a
-        # detached head: likely a tag checkout
-        if not head:
+        status = self.checkout_status()
+        if status.detached:
+            # A detached head: likely a tag checkout.
             # Greetings from Nearly Headless Nick.
             return False
-        if execute_command(["git", "status", "--short", "--untracked-files=no"]):
+        if status.dirty:
             # Uncommitted changes in files that are tracked.
             return False
         return True
 
-    def push_commands(self):
-        """Push changes to the server."""
+    def push_commands(self, tags=None):
+        """Push changes to the server.
+
+        With tags, and when the current branch has an upstream branch with
+        the same name, we push the branch and only these tags in one atomic
+        push.  Otherwise we push the branch and all tags separately.
+        """
+        if tags:
+            target = self._push_target()
+            if target is not None:
+                remote, branch = target
+                cmd = ["git", "push", "--atomic", remote, f"HEAD:refs/heads/{branch}"]
+                return [cmd + [f"refs/tags/{tag}" for tag in tags]]
         return [["git", "push"], ["git", "push", "--tags"]]
 
+    def push_fallback_commands(self, tags=None):
+        """Return commands for when the atomic push fails.
+
+        Not every server supports an atomic push.  Then we push the branch
+        and the tags separately.
+        """
+        if tags:
+            target = self._push_target()
+            if target is not None:
+                remote = target[0]
+                return [
+                    ["git", "push"],
+                    ["git", "push", remote] + [f"refs/tags/{tag}" for tag in tags],
+                ]
+        return []
+
+    def _get_config(self, name):
+        """Return the value of a git config option, or None."""
+        value = _execute_command(["git", "config", "--get", name])
+        if utils.has_exit_code(value):
+            return None
+        return value.strip() or None
+
+    def _push_target(self):
+        """Return the remote and branch that a plain git push would use.
+
+        None means we do not know for sure.
+        """
+        branch = self.checkout_status().branch
+        if branch is None:
+            return None
+        # With a different remote for pushing, like in a fork, a plain git
+        # push does not go to the upstream remote.
+        if self._get_config(f"branch.{branch}.pushRemote"):
+            return None
+        if self._get_config("remote.pushDefault"):
+            return None
+        remote = self._get_config(f"branch.{branch}.remote")
+        if not remote or remote == ".":
+            return None
+        if self._get_config(f"branch.{branch}.merge") != f"refs/heads/{branch}":
+            return None
+        return remote, branch
+
     def list_files(self):
         """List files in version control."""
-        return execute_command(["git", "ls-files"]).splitlines()
+        output = execute_command(["git", "ls-files", "-z"])
+        return [filename for filename in output.split("\0") if filename]
+
+    def _git_dir(self):
+        """Return the git directory for the current directory, or None.
+
+        Like git itself, we look for .git in the current directory and its
+        parents.  Usually this is a directory.  In a worktree or submodule,
+        .git is a file that points to the real git directory.
+        """
+        return find_git_dir(os.getcwd())
+
+    def _file_index_key(self):
+        """Return a key that changes when the list of files changes.
+
+        Git updates its index file whenever files are added, removed or
+        committed, so we look at its modification time, size and inode.
+        """
+        git_dir = self._git_dir()
+        if git_dir is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(git_dir, "index"))
+        except OSError:
+            return None
+        return (os.getcwd(), stat.st_mtime_ns, stat.st_size, stat.st_ino)
@@ -3,9 +3,9 @@
 # Script to show the log from the last relevant tag till now.
 
 from zest.releaser import utils
-from zest.releaser.utils import execute_command
 
 import logging
+import os
 import sys
 import zest.releaser.choose
 
@@ -14,10 +14,33 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    parser = utils.base_option_parser()
+    parser.add_argument(
+        "tag",
+        nargs="?",
+        help="Tag to compare with.  By default the last tag.",
+    )
+    parser.add_argument(
+        "--stat",
+        action="store_true",
+        help="Only show a summary of the changed files",
+    )
+    parser.add_argument(
+        "--name-only",
+        action="store_true",
+        help="Only show the names of the changed files",
+    )
+    parser.add_argument(
+        "--package-only",
+        action="store_true",
+        help="Only show changes in the current directory, "
+        "when the package is in a sub directory of the repository",
+    )
+    options = utils.parse_options(parser)
     utils.configure_logging()
     vcs = zest.releaser.choose.version_control()
-    if len(sys.argv) > 1:
-        found = sys.argv[-1]
+    if options.tag:
+        found = options.tag
     else:
         found = utils.get_last_tag(vcs)
     name = vcs.name
@@ -26,6 +49,13 @@ def main():
         "Picked tag '%s' for %s (currently at '%s').", full_tag, name, vcs.version
     )
     logger.info("Showing log since tag %s and the last commit.", full_tag)
-    log_command = vcs.cmd_log_since_tag(found)
+    log_command = vcs.cmd_log_since_tag(
+        found,
+        stat=options.stat,
+        name_only=options.name_only,
+        paths=[os.curdir] if options.package_only else None,
+    )
     print(utils.format_command(log_command))
-    print(execute_command(log_command))
+    returncode = utils.stream_command(log_command)
+    if returncode:
+        sys.exit(returncode)
@@ -0,0 +1,135 @@
+"""Git support through the pygit2 library.
+
+The Git class runs a git command for everything it wants to know.  When
+there are many of these questions, starting all those processes takes time.
+With pygit2 installed, and the ``git-backend`` option set to ``pygit2``, we
+answer the most common questions in this process instead: which tags and
+files there are, and whether the checkout is clean.
+
+Everything else, and certainly everything that changes the repository, is
+still done by running git, in exactly the same way as the Git class does.
+"""
+
+from zest.releaser import git
+
+import fnmatch
+import logging
+import os
+import threading
+
+
+try:
+    # This is an optional dependency.
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+logger = logging.getLogger(__name__)
+
+
+def is_available():
+    return pygit2 is not None
+
+
+class LibGit(git.Git):
+    """Git, but without running git for the most common questions.
+
+    When pygit2 cannot answer a question, we ask git after all.
+    """
+
+    def __init__(self, reporoot=None):
+        super().__init__(reporoot=reporoot)
+        # Per thread: {current directory: pygit2 Repository or None}.
+        # A pygit2 Repository must not be used by two threads at the same
+        # time, and we may ask questions concurrently, see prefetch.
+        self._local = threading.local()
+
+    def _repository(self):
+        """Return the repository for the current directory, or None."""
+        repositories = getattr(self._local, "repositories", None)
+        if repositories is None:
+            repositories = self._local.repositories = {}
+        cwd = os.getcwd()
+        if cwd not in repositories:
+            repository = None
+            try:
+                path = pygit2.discover_repository(cwd)
+                if path is not None:
+                    repository = pygit2.Repository(path)
+            except pygit2.GitError as e:
+                logger.debug("pygit2 cannot open the repository: %s", e)
+            repositories[cwd] = repository
+        return repositories[cwd]
+
+    def clear_caches(self):
+        super().clear_caches()
+        self._local = threading.local()
+
+    def available_tags(self, pattern=None):
+        repository = self._repository()
+        if repository is None:
+            return super().available_tags(pattern=pattern)
+        prefix = "refs/tags/"
+        tags = sorted(
+            name[len(prefix) :]
+            for name in repository.references
+            if name.startswith(prefix)
+        )
+        if pattern is not None:
+            tags = [tag for tag in tags if fnmatch.fnmatchcase(tag, pattern)]
+        return tags
+
+    def tag_exists(self, tag_name):
+        repository = self._repository()
+        if repository is None:
+            return super().tag_exists(tag_name)
+        return f"refs/tags/{tag_name}" in repository.references
+
+    def list_files(self):
+        """List files in version control.
+
+        Like ``git ls-files``, these are the files in the current directory
+        and below, relative to the current directory.
+        """
+        repository = self._repository()
+        if repository is None or repository.workdir is None:
+            return super().list_files()
+        index = repository.index
+        # Read the index again when it has changed on disk.
+        index.read(False)
+        # Compare real paths: the current directory may be a symlink.
+        prefix = os.path.relpath(
+            os.path.realpath(os.getcwd()), os.path.realpath(repository.workdir)
+        )
+        if prefix == os.curdir:
+            return [entry.path for entry in index]
+        prefix = prefix.replace(os.sep, "/") + "/"
+        return [
+            entry.path[len(prefix) :]
+            for entry in index
+            if entry.path.startswith(prefix)
+        ]
+
+    def is_clean_checkout(self):
+        """Is this a clean checkout?
+
+        Like ``git status --untracked-files=no``: files that are not in
+        version control do not matter.  A detached head is not clean: this
+        is likely a tag checkout.
+        """
+        repository = self._repository()
+        if repository is None:
+            return super().is_clean_checkout()
+        if repository.head_is_detached:
+            return False
+        try:
+            # Looking for untracked files is slow in a big checkout.
+            status = repository.status(untracked_files="no")
+        except TypeError:
+            # pygit2 older than 1.14 always looks for them, so let git do it.
+            return super().is_clean_checkout()
+        except pygit2.GitError as e:
+            logger.debug("pygit2 cannot get the status: %s", e)
+            return super().is_clean_checkout()
+        ignore = pygit2.GIT_STATUS_WT_NEW | pygit2.GIT_STATUS_IGNORED
+        return not any(flags & ~ignore for flags in status.values())
@@ -0,0 +1,88 @@
+"""Parsed project files, shared by everyone who needs them.
+
+The name and version of a project, and the zest.releaser options, come from
+``pyproject.toml`` and ``setup.cfg``.  Several places need these files, and
+a full release needs them many times.  We parse each file only once, and
+parse it again only when it has changed.
+
+Treat the returned objects as read-only: they are shared.
+"""
+
+from configparser import ConfigParser
+from zest.releaser import utils
+
+import logging
+import os
+
+
+try:
+    # Python 3.11+
+    import tomllib
+except ImportError:
+    # Python 3.10-
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_config(filename):
+    config = ConfigParser(interpolation=None)
+    config.read(filename)
+    return config
+
+
+def _parse_toml(filename):
+    with open(filename, "rb") as tomlfile:
+        return tomllib.load(tomlfile)
+
+
+class ProjectMetadata:
+    """Cache of parsed project files.
+
+    The cache is keyed on the absolute filename, and an entry is only used
+    when the file signature (modification time, size and hash) is the same
+    as when we parsed it.
+    """
+
+    def __init__(self):
+        # {(parser, absolute filename): (file signature, parsed contents)}
+        self._parsed = {}
+
+    def clear(self):
+        self._parsed = {}
+
+    def _get(self, filename, parser):
+        filename = os.path.abspath(filename)
+        signature = utils.file_signature(filename)
+        key = (parser, filename)
+        if signature is None:
+            # The file does not exist (anymore).
+            self._parsed.pop(key, None)
+            return None
+        cached = self._parsed.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        logger.debug("Parsing %s", filename)
+        result = parser(filename)
+        self._parsed[key] = (signature, result)
+        return result
+
+    def read_config(self, filename):
+        """Return the ConfigParser for this ini-style file, or None.
+
+        Interpolation is switched off, as setuptools does.
+        """
+        return self._get(filename, _parse_config)
+
+    def read_toml(self, filename):
+        """Return the contents of this toml file as dictionary, or None."""
+        return self._get(filename, _parse_toml)
+
+    def setup_cfg(self):
+        return self.read_config("setup.cfg")
+
+    def pyproject_toml(self):
+        return self.read_toml("pyproject.toml")
+
+
+project_metadata = ProjectMetadata()
@@ -66,6 +66,8 @@ class Postreleaser(baserelease.Basereleaser):
                 update_history=True,
             )
         )
+        # The version before we change it to a development version.
+        self._released_version = None
 
     def prepare(self):
         """Prepare self.data by asking about new dev version"""
@@ -82,7 +84,16 @@ class Postreleaser(baserelease.Basereleaser):
             self._change_header(add=True)
             self._write_history()
         self._diff_and_commit()
-        self._push()
+        self._push(tags=self._release_tags())
+
+    def _release_tags(self):
+        """Return the tag of the release that we have just done, if any."""
+        if not self._released_version:
+            return None
+        tag = self.zest_releaser_config.tag_format(self._released_version)
+        if not self.vcs.tag_exists(tag):
+            return None
+        return [tag]
 
     def _ask_for_new_dev_version(self):
         """Ask for and store a new dev version string."""
@@ -92,6 +103,7 @@ class Postreleaser(baserelease.Basereleaser):
             sys.exit(1)
         # Clean it up to a non-development version.
         current = utils.cleanup_version(current)
+        self._released_version = current
         params = dict(
             alpha=self.data["alpha"],
             beta=self.data["beta"],
@@ -57,6 +57,8 @@ class Prereleaser(baserelease.Basereleaser):
 
     def prepare(self):
         """Prepare self.data by asking about new version etc."""
+        # Get the status and version at the same time.
+        self.vcs.prefetch()
         if not utils.sanity_check(self.vcs):
             logger.critical("Sanity check failed.")
             sys.exit(1)
@@ -1,20 +1,16 @@
+from .metadata import project_metadata
 from .utils import extract_zestreleaser_configparser
+from .utils import mark_written
 from configparser import ConfigParser
 from configparser import NoOptionError
 from configparser import NoSectionError
 
+import copy
 import logging
 import os
 import sys
 
 
-try:
-    # Python 3.11+
-    import tomllib
-except ImportError:
-    # Python 3.10-
-    import tomli as tomllib
-
 DIST_CONFIG_FILE = ".pypirc"
 SETUP_CONFIG_FILE = "setup.cfg"
 PYPROJECTTOML_CONFIG_FILE = "pyproject.toml"
@@ -77,11 +73,13 @@ class SetupConfig(BaseConfig):
     def __init__(self):
         """Grab the configuration (overridable for test purposes)"""
         # If there is a setup.cfg in the package, parse it
-        if not os.path.exists(self.config_filename):
+        parsed = project_metadata.read_config(self.config_filename)
+        if parsed is None:
             self.config = None
             return
+        # We may fix the config, so use our own copy.
         self.config = ConfigParser(interpolation=None)
-        self.config.read(self.config_filename)
+        self.config.read_dict(parsed)
 
     def has_bad_commands(self):
         if self.config is None:
@@ -121,6 +119,7 @@ class SetupConfig(BaseConfig):
             self.config.set("egg_info", "tag_build", "")
         if self.config.has_option("egg_info", "tag_svn_revision"):
             self.config.set("egg_info", "tag_svn_revision", "false")
+        mark_written(self.config_filename)
         new_setup = open(self.config_filename, "w")
         try:
             self.config.write(new_setup)
@@ -184,9 +183,11 @@ class PypiConfig(BaseConfig):
             self.config = None
             return
         self.config = ConfigParser(interpolation=None)
-        self.config.read(config_filename)
+        self.config.read_dict(project_metadata.read_config(config_filename))
         if not self.omit_package_config_in_test:
-            self.config.read(SETUP_CONFIG_FILE)
+            setup_cfg = project_metadata.read_config(SETUP_CONFIG_FILE)
+            if setup_cfg is not None:
+                self.config.read_dict(setup_cfg)
 
     def twine_repository(self):
         """Gets the repository from Twine environment variables."""
@@ -260,11 +261,7 @@ class PyprojectTomlConfig(BaseConfig):
     def __init__(self):
         """Grab the configuration (overridable for test purposes)"""
         # If there is a pyproject.toml in the package, parse it
-        if not os.path.exists(self.config_filename):
-            self.config = None
-            return
-        with open(self.config_filename, "rb") as tomlconfig:
-            self.config = tomllib.load(tomlconfig)
+        self.config = project_metadata.read_toml(self.config_filename)
 
     def _file_with_version_from_hatch(self):
         # Hatch also has an option for a dynamic version.
@@ -278,7 +275,8 @@ class PyprojectTomlConfig(BaseConfig):
         if self.config is None:
             return None
         try:
-            result = self.config["tool"]["zest-releaser"]
+            # Copy it: the parsed file is shared, and we may change this.
+            result = copy.deepcopy(self.config["tool"]["zest-releaser"])
         except KeyError:
             logger.debug(
                 f"No [tool.zest-releaser] section found in the {self.config_filename}"
@@ -629,6 +627,213 @@ class ZestReleaserConfig:
         print("{version} needs to be part of 'tag-format': %s" % fmt)
         sys.exit(1)
 
+    def tag_format_template(self):
+        """Return the tag format, with ``{version}`` in it.
+
+        This is like ``tag_format``, but returns the template instead of
+        filling it in, and does not complain.  A format without version
+        gives the default ``{version}``.
+        """
+        fmt = self.config.get("tag-format", "{version}")
+        if "{version}" in fmt:
+            return fmt
+        if "%(version)s" in fmt:
+            return fmt.replace("%(version)s", "{version}")
+        return "{version}"
+
+    def checkout_strategy(self):
+        """Return how to make the temporary checkout of the tag.
+
+        - ``clone``: a fresh clone of the repository.
+        - ``shared``: a clone that shares the objects of the original
+          repository, instead of copying them.
+        - ``worktree``: a git worktree of the original repository.  We remove
+          it after the release.
+        - ``archive``: only the files of the tag, exported with
+          ``git archive``, without git information.
+        - ``auto``: ``archive`` when building the package does not need git
+          information, like it does with setuptools-scm, otherwise ``clone``.
+
+        With ``shared`` and ``worktree`` only the files of the tag are
+        written to disk, which is a lot faster for big repositories::
+
+            [zest.releaser]
+            checkout-strategy = worktree
+
+        The default when this option has not been set is ``clone``.
+        """
+        default = "clone"
+        result = self.config.get("checkout-strategy", default).strip().lower()
+        if result not in ("clone", "shared", "worktree", "archive", "auto"):
+            logger.warning(
+                "Unknown checkout-strategy %r, using %r instead.", result, default
+            )
+            return default
+        return result
+
+    def sparse_checkout(self):
+        """Return whether the tag checkout only has the files of the package.
+
+        When you release a package from a sub directory of a big repository,
+        we only need that directory in the tag checkout.  With this option
+        we make a partial clone, which only gets the files that are checked
+        out, and a sparse checkout of the sub directory of the package, plus
+        the files in the root of the repository::
+
+            [zest.releaser]
+            sparse-checkout = yes
+
+        This has no effect when the package is in the root of the repository.
+
+        The default when this option has not been set is False.
+        """
+        return self.config.get("sparse-checkout", False)
+
+    def sparse_checkout_paths(self):
+        """Return extra directories for a sparse tag checkout.
+
+        When building your package needs files from other directories of the
+        repository, you can add them, separated by spaces or newlines::
+
+            [zest.releaser]
+            sparse-checkout-paths =
+                shared/config
+                docs
+
+        The default when this option has not been set is an empty list.
+        """
+        result = self.config.get("sparse-checkout-paths", [])
+        if isinstance(result, str):
+            result = result.split()
+        return [path.strip("/") for path in result if path.strip("/")]
+
+    def submodule_jobs(self):
+        """Return how many submodules to fetch at the same time.
+
+        When the tag checkout has submodules, git fetches them one by one.
+        You can let git fetch more of them in parallel::
+
+            [zest.releaser]
+            submodule-jobs = 8
+
+        The default when this option has not been set is 0: let git decide.
+        """
+        return self.config.get("submodule-jobs", 0)
+
+    def submodule_depth(self):
+        """Return how much history to fetch for submodules.
+
+        For a release we only need the files of the submodules, not their
+        history.  With a depth, git makes shallow clones of the submodules::
+
+            [zest.releaser]
+            submodule-depth = 1
+
+        The default when this option has not been set is 0: all history.
+        """
+        return self.config.get("submodule-depth", 0)
+
+    def build_log(self):
+        """Return the file to write the output of building the package to.
+
+        We only show the first and last lines of the output of the build,
+        unless there are errors.  To see everything, you can let us write all
+        output to a file::
+
+            [zest.releaser]
+            build-log = build.log
+
+        A relative path is relative to the directory where you start the
+        release.  We add to the file when it already exists.
+
+        The default when this option has not been set is None: no file.
+        """
+        result = self.config.get("build-log")
+        if not result:
+            return None
+        return os.path.expanduser(result.strip())
+
+    def git_backend(self):
+        """Return how we talk to git: ``subprocess`` or ``pygit2``.
+
+        By default we run a git command for everything.  When you have
+        installed pygit2, we can use that to list tags and files, and to
+        check if the checkout is clean, without running git::
+
+            [zest.releaser]
+            git-backend = pygit2
+
+        When pygit2 is not installed, we run git, as usual.
+
+        The default when this option has not been set is ``subprocess``.
+        """
+        default = "subprocess"
+        result = self.config.get("git-backend", default).strip().lower()
+        if result not in ("subprocess", "pygit2"):
+            logger.warning(
+                "Unknown git-backend %r, using %r instead.", result, default
+            )
+            return default
+        return result
+
+    def known_warnings(self):
+        """Return extra lines of stderr output that are only warnings.
+
+        When a command prints to stderr, we mark each line as error, unless
+        it starts with a known warning, like ``warning``.  You can add
+        your own, one per line.  Case does not matter::
+
+            [zest.releaser]
+            known-warnings =
+                DEPRECATION:
+                listing git files failed
+
+        The default when this option has not been set is an empty list.
+        """
+        result = self.config.get("known-warnings", [])
+        if isinstance(result, str):
+            result = result.splitlines()
+        return [warning.strip() for warning in result if warning.strip()]
+
+    def pythonpath_for_all_commands(self):
+        """Return whether all commands get our PYTHONPATH.
+
+        We run commands with PYTHONPATH set to the ``sys.path`` of
+        zest.releaser.  A command like ``git`` does not need this.  When the
+        long PYTHONPATH gets in the way, you can give it only to Python
+        commands::
+
+            [zest.releaser]
+            pythonpath-for-all-commands = no
+
+        The default when this option has not been set is True.
+        """
+        return self.config.get("pythonpath-for-all-commands", True)
+
+    def tag_lookup(self):
+        """Return how to find the last tag: ``version`` or ``reachable``.
+
+        By default, the last tag is the tag with the greatest version that is
+        not greater than the current version.  This looks at all tags, also
+        those on other branches.  On a maintenance branch you may want the
+        nearest tag in the history of the current commit instead::
+
+            [zest.releaser]
+            tag-lookup = reachable
+
+        When no suitable tag is reachable, we compare versions after all.
+
+        The default when this option has not been set is ``version``.
+        """
+        default = "version"
+        result = self.config.get("tag-lookup", default).strip().lower()
+        if result not in ("version", "reachable"):
+            logger.warning(
+                "Unknown tag-lookup %r, using %r instead.", result, default
+            )
+            return default
+        return result
+
     def tag_message(self, version):
         """Return the commit message to be used when tagging.
 
@@ -689,6 +894,67 @@ class ZestReleaserConfig:
             return default
         return result
 
+    def verify_name(self):
+        """Return whether all sources of the package name should be checked.
+
+        We get the package name from the first file that has it: setup.cfg,
+        pyproject.toml or setup.py, in that order.  Reading a file is a lot
+        faster than running setup.py.  With this option we look in all of
+        them and warn when they have different names::
+
+            [zest.releaser]
+            verify-name = yes
+
+        The default when this option has not been set is False.
+        """
+        return self.config.get("verify-name", False)
+
+    def git_fsmonitor(self):
+        """Return whether git may use its file system monitor.
+
+        To see if the checkout is clean, git checks all files.  In a huge
+        checkout this can be slow.  On some platforms git can use a file
+        system monitor to know which files have changed::
+
+            [zest.releaser]
+            git-fsmonitor = yes
+
+        The default when this option has not been set is False.
+        """
+        return self.config.get("git-fsmonitor", False)
+
+    def read_git_refs(self):
+        """Return whether to read git tags directly from the repository.
+
+        We read the tags from the files in the ``.git`` directory, instead
+        of running ``git tag`` each time.  This is a lot faster when there
+        are many tags.  When this gives problems, you can switch it off::
+
+            [zest.releaser]
+            read-git-refs = no
+
+        The default when this option has not been set is True.
+        """
+        return self.config.get("read-git-refs", True)
+
+    def setup_py_worker(self):
+        """Return whether to run setup.py in a worker process.
+
+        When we cannot read the name or version from setup.py directly, we
+        need to run ``python setup.py --version``.  This starts Python and
+        imports setuptools each time, which is slow.  With this option we
+        start one worker process that imports setuptools once, and runs all
+        setup.py files for us::
+
+            [zest.releaser]
+            setup-py-worker = yes
+
+        When the worker fails, we run setup.py the usual way.
+
+        The default when this option has not been set is False.
+        """
+        return self.config.get("setup-py-worker", False)
+
     def run_pre_commit(self):
         """Return whether we should run pre commit hooks.
 
@@ -5,6 +5,7 @@ from build.env import DefaultIsolatedEnv
 from colorama import Fore
 from packaging.utils import canonicalize_name
 
+import functools
 import logging
 import os
 import requests
@@ -33,7 +34,7 @@ DATA.update(
     {
         "tag_already_exists": "Internal detail, don't touch this :-)",
         "tagdir": """Directory where the tag checkout is placed (*if* a tag
-    checkout has been made)""",
+    checkout has been made, and it has not been removed afterwards)""",
         "tagworkingdir": """Working directory inside the tag checkout. This is
     the same, except when you make a release from within a sub directory.
     We then make sure you end up in the same relative directory after a
@@ -59,7 +60,7 @@ def package_in_pypi(package):
         return False
 
 
-def _project_builder_runner(cmd, cwd=None, extra_environ=None):
+def _project_builder_runner(cmd, cwd=None, extra_environ=None, build_log=None):
     """Run the build command and format warnings and errors.
 
     It runs the build command in a subprocess.
@@ -80,14 +81,18 @@ def _project_builder_runner(cmd, cwd=None, extra_environ=None):
     execute_command then combined this with the current environment and with
     the PYTHONPATH.  That last part gave unwanted results: an upper bound
     on the setuptools version in the build-system was ignored.
+
+    Building can give lots of output, so we read it while the build runs,
+    and only keep the start and the end.  With build_log, all output is
+    written to this file.
     """
-    env = os.environ.copy()
-    if extra_environ:
-        env.update(extra_environ)
-    utils.show_interesting_lines(execute_command(cmd, cwd=cwd, env=env))
+    env = utils.command_environment(extra_environ=extra_environ, pythonpath=False)
+    utils.show_interesting_lines(
+        execute_command(cmd, cwd=cwd, env=env, stream=True, log_file=build_log)
+    )
 
 
-def _build_in_isolated_env(distribution):
+def _build_in_isolated_env(distribution, build_log=None):
     """Build distribution in isolated env.
 
     This is our variant of the _build_in_isolated_env function from the
@@ -102,7 +107,7 @@ def _build_in_isolated_env(distribution):
         builder = ProjectBuilder.from_isolated_env(
             env,
             source_dir=".",
-            runner=_project_builder_runner,
+            runner=functools.partial(_project_builder_runner, build_log=build_log),
         )
         env.install(builder.build_system_requires)
         env.install(builder.get_requires_for_build(distribution))
@@ -123,6 +128,8 @@ class Releaser(baserelease.Basereleaser):
 
     def prepare(self):
         """Collect some data needed for releasing"""
+        # Get the version and the tags at the same time.
+        self.vcs.prefetch(status=False, tags=True)
         self._grab_version()
         tag = self.zest_releaser_config.tag_format(self.data["version"])
         self.data["tag"] = tag
@@ -132,6 +139,22 @@ class Releaser(baserelease.Basereleaser):
         self.data["tag-signing"] = self.zest_releaser_config.tag_signing()
         self.data["tag_already_exists"] = self.vcs.tag_exists(tag)
 
+    def run(self):
+        try:
+            super().run()
+        finally:
+            # Only now, so the 'after' hooks can still use the tag checkout.
+            self._cleanup_checkout()
+
+    def _cleanup_checkout(self):
+        tagdir = self.data.get("tagdir")
+        if not tagdir:
+            return
+        os.chdir(self.vcs.workingdir)
+        if self.vcs.cleanup_checkout_dir(tagdir):
+            logger.info("Removed tag checkout %s", tagdir)
+            self.data["tagdir"] = None
+
     def execute(self):
         """Do the actual releasing"""
         self._info_if_tag_already_exists()
@@ -182,13 +205,17 @@ class Releaser(baserelease.Basereleaser):
             "Making a source distribution of a fresh tag checkout (in %s).",
             self.data["tagworkingdir"],
         )
-        _build_in_isolated_env("sdist")
+        build_log = self.zest_releaser_config.build_log()
+        if build_log:
+            build_log = os.path.join(self.vcs.workingdir, build_log)
+            logger.info("Writing the output of the build to %s", build_log)
+        _build_in_isolated_env("sdist", build_log=build_log)
         if self.zest_releaser_config.create_wheel():
             logger.info(
                 "Making a wheel of a fresh tag checkout (in %s).",
                 self.data["tagworkingdir"],
             )
-            _build_in_isolated_env("wheel")
+            _build_in_isolated_env("wheel", build_log=build_log)
         if not self.zest_releaser_config.upload_pypi():
             logger.info("Upload to PyPI was disabled in the configuration.")
             return
@@ -0,0 +1,449 @@
+"""Get metadata from a setup.py without running it, where possible.
+
+Running ``python setup.py --version`` means starting a new Python process and
+importing setuptools, which takes a second or more.  Most setup.py files
+contain the name and version as a literal string though, so we can simply
+parse the file.  When we cannot determine the value for certain, we return
+None, and the caller should run setup.py after all.
+
+Running setup.py can be done in a worker process, see ``SetupPyWorker``.
+This imports setuptools only once, instead of once per call.
+"""
+
+from packaging.version import InvalidVersion
+from packaging.version import Version
+from zest.releaser import utils
+from zest.releaser.metadata import project_metadata
+
+import ast
+import atexit
+import json
+import logging
+import os
+import subprocess
+import sys
+import traceback
+
+
+logger = logging.getLogger(__name__)
+
+# Methods that we can apply to a string that we read from a file.
+STRIP_METHODS = ("strip", "lstrip", "rstrip")
+# Parsed setup.py files: {absolute filename: (file signature, tree)}
+_PARSED = {}
+
+
+def _parse(filename):
+    """Return the parsed syntax tree of the file, or None."""
+    filename = os.path.abspath(filename)
+    signature = utils.file_signature(filename)
+    if signature is None:
+        return None
+    cached = _PARSED.get(filename)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        with open(filename, "rb") as f:
+            tree = ast.parse(f.read(), filename=filename)
+    except (SyntaxError, ValueError) as e:
+        # Running setup.py will show the error.
+        logger.debug("Could not parse %s: %s", filename, e)
+        tree = None
+    _PARSED[filename] = (signature, tree)
+    return tree
+
+
+def _is_setup_call(node):
+    if not isinstance(node, ast.Call):
+        return False
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id == "setup"
+    if isinstance(func, ast.Attribute):
+        return func.attr == "setup"
+    return False
+
+
+def _dotted_name(node):
+    """Return 'os.path.join' for the ast of os.path.join, or None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.insert(0, node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.insert(0, node.id)
+    return ".".join(parts)
+
+
+class _SetupPyParser:
+    """Resolve keyword arguments of the setup() call in a parsed setup.py."""
+
+    def __init__(self, tree, filename):
+        self.tree = tree
+        self.filename = os.path.abspath(filename)
+        self.directory = os.path.dirname(self.filename)
+        # All places where a name gets bound: {name: [value node or None]}.
+        # We only trust a name when it is bound exactly once.
+        self.bindings = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign):
+                if len(node.targets) == 1:
+                    self._bind(node.targets[0], node.value)
+                else:
+                    for target in node.targets:
+                        self._bind(target, None)
+            elif isinstance(node, ast.withitem):
+                if node.optional_vars is not None:
+                    self._bind(node.optional_vars, node.context_expr)
+            elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+                self._bind(node.target, None)
+            elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+                self._bind(node.target, None)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    name = alias.asname or alias.name.split(".")[0]
+                    self.bindings.setdefault(name, []).append(None)
+            elif isinstance(
+                node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            ):
+                self.bindings.setdefault(node.name, []).append(None)
+            elif isinstance(node, ast.arg):
+                self.bindings.setdefault(node.arg, []).append(None)
+            elif isinstance(node, ast.NamedExpr):
+                self._bind(node.target, None)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                for name in node.names:
+                    self.bindings.setdefault(name, []).append(None)
+
+    def _bind(self, target, value):
+        if isinstance(target, ast.Name):
+            self.bindings.setdefault(target.id, []).append(value)
+            return
+        # Tuple unpacking, subscripts, attributes: too complicated.
+        for node in ast.walk(target):
+            if isinstance(node, ast.Name):
+                self.bindings.setdefault(node.id, []).append(None)
+
+    def _lookup(self, name, seen):
+        """Return the node bound to this name, if it is bound only once."""
+        if name in seen:
+            return None
+        values = self.bindings.get(name, [])
+        if len(values) != 1:
+            return None
+        seen.add(name)
+        return values[0]
+
+    def keyword_node(self, keyword):
+        """Return the value node of the keyword in the setup() call."""
+        calls = [node for node in ast.walk(self.tree) if _is_setup_call(node)]
+        if len(calls) != 1:
+            return None
+        for kw in calls[0].keywords:
+            if kw.arg == keyword:
+                return kw.value
+        return None
+
+    def resolve(self, node, seen=None):
+        """Return the string value of the node, or None."""
+        if seen is None:
+            seen = set()
+        if node is None:
+            return None
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                return node.value
+            return None
+        if isinstance(node, ast.Name):
+            return self.resolve(self._lookup(node.id, seen), seen)
+        if not isinstance(node, ast.Call) or node.keywords:
+            return None
+        func = node.func
+        if not isinstance(func, ast.Attribute):
+            return None
+        if func.attr in STRIP_METHODS:
+            if len(node.args) > 1:
+                return None
+            chars = None
+            if node.args:
+                chars = self.resolve(node.args[0], seen)
+                if chars is None:
+                    return None
+            value = self.resolve(func.value, seen)
+            if value is None:
+                return None
+            return getattr(value, func.attr)(chars)
+        if func.attr == "read" and not node.args:
+            return self._read(func.value, seen)
+        return None
+
+    def _read(self, node, seen):
+        """Return the contents of the file opened in this node, or None."""
+        if isinstance(node, ast.Name):
+            node = self._lookup(node.id, seen)
+        if not isinstance(node, ast.Call) or _dotted_name(node.func) not in (
+            "open",
+            "io.open",
+        ):
+            return None
+        if not node.args or len(node.args) > 2:
+            return None
+        mode = "r"
+        if len(node.args) == 2:
+            mode = self.resolve(node.args[1], seen)
+        encoding = "utf-8"
+        for kw in node.keywords:
+            if kw.arg == "mode":
+                mode = self.resolve(kw.value, seen)
+            elif kw.arg == "encoding":
+                encoding = self.resolve(kw.value, seen)
+            else:
+                return None
+        if mode not in ("r", "rt") or encoding is None:
+            return None
+        path = self._path(node.args[0], seen)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding=encoding) as f:
+                return f.read()
+        except (OSError, LookupError, UnicodeDecodeError):
+            return None
+
+    def _path(self, node, seen):
+        """Return the absolute path for this node, or None."""
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, str):
+                return None
+            return os.path.join(self.directory, node.value)
+        if isinstance(node, ast.Name):
+            if node.id == "__file__":
+                return self.filename
+            return self._path(self._lookup(node.id, seen), seen)
+        if not isinstance(node, ast.Call) or node.keywords:
+            return None
+        func_name = _dotted_name(node.func)
+        if func_name in ("os.path.dirname", "os.path.abspath", "os.path.realpath"):
+            if len(node.args) != 1:
+                return None
+            path = self._path(node.args[0], seen)
+            if path is None:
+                return None
+            if func_name == "os.path.dirname":
+                return os.path.dirname(path)
+            return path
+        if func_name == "os.path.join" and node.args:
+            path = self._path(node.args[0], seen)
+            parts = [self.resolve(arg, seen) for arg in node.args[1:]]
+            if path is None or None in parts:
+                return None
+            return os.path.join(path, *parts)
+        return None
+
+
+def _defined_in_setup_cfg(keyword, filename):
+    """Is the keyword set in the [metadata] of a setup.cfg next to setup.py?
+
+    setuptools lets setup.cfg override the arguments of the setup call.
+    """
+    setup_cfg = os.path.join(os.path.dirname(os.path.abspath(filename)), "setup.cfg")
+    config = project_metadata.read_config(setup_cfg)
+    if config is None:
+        return False
+    return config.has_option("metadata", keyword)
+
+
+def static_metadata(keyword, filename="setup.py"):
+    """Return the value of a setup() keyword without running setup.py.
+
+    We support:
+
+    - a literal string: ``setup(version='1.0')``
+    - a variable that is set once: ``version = '1.0'`` and
+      ``setup(version=version)``
+    - reading a file: ``version = open('version.txt').read().strip()``,
+      also with ``with open('version.txt') as f``.
+
+    Return None when we cannot determine the value this way.
+
+    Versions are normalized like setuptools does it.  When setuptools would
+    complain about the version, we return None as well, so the caller runs
+    setup.py and the user sees the complaint.
+    """
+    tree = _parse(filename)
+    if tree is None:
+        return None
+    if _defined_in_setup_cfg(keyword, filename):
+        return None
+    parser = _SetupPyParser(tree, filename)
+    value = parser.resolve(parser.keyword_node(keyword))
+    if not value:
+        return None
+    if keyword == "version":
+        try:
+            value = str(Version(value.strip()))
+        except InvalidVersion:
+            return None
+    logger.debug("Found %s %s in %s without running it.", keyword, value, filename)
+    return value
+
+
+def _evaluate_setup_py(directory):
+    """Run setup.py in the directory, and return its name and version.
+
+    This is called in the worker process.  setuptools is already imported.
+    We let distutils stop after reading the config files, so no command is
+    run.  Afterwards we restore the state of the process, except for the
+    modules that were already imported before: setuptools stays loaded.
+    """
+    from distutils import core
+
+    saved_cwd = os.getcwd()
+    saved_path = sys.path[:]
+    saved_modules = set(sys.modules)
+    try:
+        os.chdir(directory)
+        # Like 'python setup.py' does.
+        sys.path.insert(0, directory)
+        core._setup_distribution = None
+        dist = core.run_setup("setup.py", script_args=[], stop_after="config")
+        return {"name": dist.get_name(), "version": dist.get_version()}
+    finally:
+        os.chdir(saved_cwd)
+        sys.path[:] = saved_path
+        for module in set(sys.modules) - saved_modules:
+            del sys.modules[module]
+
+
+def worker_main():
+    """Answer requests for setup.py metadata, one json line at a time.
+
+    A request is the directory with the setup.py.  The answer is a
+    dictionary with the name and version, or with an error.  We read
+    requests from stdin and answer on stdout.  Anything that setup.py prints
+    goes to stderr instead, so it does not mix with our answers.
+    """
+    # With 'python -m' the current directory is added to the path.  We do
+    # not want to import from there when we are in another directory.
+    del sys.path[0]
+    requests = os.fdopen(os.dup(0), "r")
+    answers = os.fdopen(os.dup(1), "w")
+    with open(os.devnull) as devnull:
+        os.dup2(devnull.fileno(), 0)
+    os.dup2(2, 1)
+    import setuptools  # noqa: F401  This is the slow import we do only once.
+
+    for line in requests:
+        try:
+            answer = _evaluate_setup_py(json.loads(line))
+        except BaseException:
+            answer = {"error": traceback.format_exc()}
+        answers.write(json.dumps(answer) + "\n")
+        answers.flush()
+
+
+class SetupPyWorker:
+    """Long-running Python process that runs setup.py files for us.
+
+    Starting Python and importing setuptools takes most of the time of a
+    ``python setup.py --version`` call.  The worker does this once, and then
+    answers all questions for all packages during this run.
+
+    When the worker fails for some reason, ``metadata`` returns None, and
+    you should run setup.py the usual way.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.broken = False
+        # {(directory, change counter, file signatures): answer}
+        self._answers = {}
+
+    def start(self):
+        env = utils.command_environment()
+        command = [sys.executable, "-m", "zest.releaser.setuppy"]
+        logger.debug("Starting setup.py worker: '%s'", utils.format_command(command))
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+        )
+
+    def stop(self):
+        if self.process is None:
+            return
+        process = self.process
+        self.process = None
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def _ask(self, directory):
+        if self.process is None:
+            self.start()
+        try:
+            self.process.stdin.write(json.dumps(directory) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except OSError:
+            line = ""
+        if not line:
+            logger.debug("The setup.py worker has stopped unexpectedly.")
+            self.broken = True
+            self.stop()
+            return None
+        return json.loads(line)
+
+    def metadata(self, directory=None):
+        """Return a dictionary with the name and version, or None."""
+        if self.broken:
+            return None
+        directory = os.path.abspath(directory or os.getcwd())
+        # setup.py may read other files, like a version.txt.  We do not know
+        # which ones, so after we have written any file, we ask again.
+        key = (
+            directory,
+            utils.change_counter(),
+            tuple(
+                utils.file_signature(os.path.join(directory, filename))
+                for filename in ("setup.py", "setup.cfg", "pyproject.toml")
+            ),
+        )
+        if key in self._answers:
+            return self._answers[key]
+        answer = self._ask(directory)
+        if answer is None:
+            return None
+        if "error" in answer:
+            logger.debug("The setup.py worker failed:\n%s", answer["error"])
+            # The caller runs setup.py itself and reports the error.
+            answer = None
+        self._answers[key] = answer
+        return answer
+
+
+worker = SetupPyWorker()
+atexit.register(worker.stop)
+
+
+def worker_metadata(keyword):
+    """Return the value of a setup() keyword by running setup.py in the worker.
+
+    Return None when this fails.
+    """
+    answer = worker.metadata()
+    if not answer:
+        return None
+    return answer.get(keyword)
+
+
+if __name__ == "__main__":
+    worker_main()
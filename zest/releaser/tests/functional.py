@@ -19,6 +19,7 @@ def setup(test):
     # Reset constants to original settings:
     utils.AUTO_RESPONSE = False
     utils.TESTMODE = False
+    utils.forget_written_files()
 
     partstestdir = os.getcwd()  # Buildout's test run in parts/test
     test.orig_dir = partstestdir
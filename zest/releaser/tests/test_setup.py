@@ -1,6 +1,7 @@
 from .functional import setup
 from .functional import teardown
 from colorama import Fore
+from zest.releaser import libgit
 from zope.testing import renormalizing
 
 import doctest
@@ -84,6 +85,9 @@ def test_suite():
         if filename.startswith("pypirc_"):
             # Sample pypirc file
             continue
+        if filename == "libgit.txt" and not libgit.is_available():
+            # The optional pygit2 is not installed.
+            continue
         doctests.append(filename)
 
     suite.addTests(
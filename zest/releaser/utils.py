@@ -5,13 +5,20 @@ from colorama import Fore
 from packaging.version import InvalidVersion
 from packaging.version import parse as parse_version
 
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
 import logging
 import os
 import re
 import shlex
 import subprocess
 import sys
+import tempfile
 import textwrap
+import threading
 import tokenize
 
 
@@ -20,6 +27,38 @@ logger = logging.getLogger(__name__)
 WRONG_IN_VERSION = ["svn", "dev", "("]
 AUTO_RESPONSE = False
 VERBOSE = False
+# See change_counter.
+_CHANGE_COUNTER = 0
+# See written_files.
+_WRITTEN_FILES = set()
+# Add PYTHONPATH to the environment of all commands, not only Python.
+PYTHONPATH_FOR_ALL_COMMANDS = True
+# See command_environment.
+_ENVIRONMENT_SOURCE = None
+_ENVIRONMENTS = collections.OrderedDict()
+_ENVIRONMENTS_LOCK = threading.Lock()
+MAX_ENVIRONMENTS = 8
+# Git commands that do not change anything, see is_read_only_command.
+READ_ONLY_GIT_COMMANDS = {
+    "cat-file",
+    "describe",
+    "diff",
+    "for-each-ref",
+    "grep",
+    "log",
+    "ls-files",
+    "ls-tree",
+    "rev-parse",
+    "show",
+    "status",
+}
+# Read-only git commands that look at the files in the working tree.
+WORKTREE_GIT_COMMANDS = {"diff", "status"}
+# Arguments of setup.py that only ask for metadata, see is_metadata_command.
+SETUP_PY_METADATA_ARGUMENTS = {"egg_info", "--name", "--version"}
+# See command_cache.
+_COMMAND_CACHE = None
+_COMMAND_CACHE_STATS = collections.Counter()
 
 if sys.version_info.major == 3 and sys.version_info.minor < 10:
     from importlib_metadata import entry_points
@@ -52,11 +91,129 @@ def splitlines_with_trailing(content):
     return lines
 
 
+def change_counter():
+    """Return a number that changes whenever we may have changed something.
+
+    You can use this to know when to forget cached information about the
+    checkout, like its status.
+    """
+    return _CHANGE_COUNTER
+
+
+def mark_changed(files_only=False):
+    """Note that we have changed files or run a command that may do that.
+
+    With files_only, we have only written files in the working tree, so
+    for example the list of tags is still the same.
+    """
+    global _CHANGE_COUNTER
+    _CHANGE_COUNTER += 1
+    if files_only:
+        forget_cached_commands(WORKTREE_GIT_COMMANDS)
+    else:
+        forget_cached_commands()
+
+
+def mark_written(filename):
+    """Note that we have written this file, so it should be committed."""
+    mark_changed(files_only=True)
+    if _WRITTEN_FILES is not None:
+        _WRITTEN_FILES.add(os.path.abspath(filename))
+
+
+def mark_unknown_writes():
+    """Note that code we do not know, like a hook, may have written files."""
+    global _WRITTEN_FILES
+    mark_changed()
+    _WRITTEN_FILES = None
+
+
+def written_files():
+    """Return the files that we have written since the last commit.
+
+    This is a sorted list of absolute paths.  None means that other files
+    may have been written too, so you should look at all files.
+    """
+    if _WRITTEN_FILES is None:
+        return None
+    return sorted(_WRITTEN_FILES)
+
+
+def forget_written_files():
+    """Start over after a commit."""
+    global _WRITTEN_FILES
+    _WRITTEN_FILES = set()
+
+
+@contextlib.contextmanager
+def command_cache():
+    """Remember the output of read-only git commands while we are active.
+
+    During a release we ask git the same things many times, like the list
+    of tags.  The answer only changes when we run a command that may
+    change something, see is_read_only_command, or write files.  Then we
+    forget the answers that may have changed, see mark_changed.
+
+    This can be nested: only the outermost one clears the cache.
+    """
+    global _COMMAND_CACHE, _COMMAND_CACHE_STATS
+    if _COMMAND_CACHE is not None:
+        yield
+        return
+    _COMMAND_CACHE = {}
+    _COMMAND_CACHE_STATS = collections.Counter()
+    try:
+        yield
+    finally:
+        _COMMAND_CACHE = None
+        logger.debug(
+            "Command cache: %d hits, %d misses.",
+            _COMMAND_CACHE_STATS["hit"],
+            _COMMAND_CACHE_STATS["miss"],
+        )
+
+
+def command_cache_stats():
+    """Return the number of hits and misses of the last command cache."""
+    return _COMMAND_CACHE_STATS["hit"], _COMMAND_CACHE_STATS["miss"]
+
+
+def forget_cached_commands(subcommands=None):
+    """Forget the output of cached commands.
+
+    With subcommands, like ``{"status"}``, only forget those git commands.
+    """
+    if not _COMMAND_CACHE:
+        return
+    if subcommands is None:
+        _COMMAND_CACHE.clear()
+        return
+    for key in list(_COMMAND_CACHE):
+        if _git_subcommand(key[0])[0] in subcommands:
+            _COMMAND_CACHE.pop(key, None)
+
+
 def write_text_file(filename, contents, encoding=None):
+    mark_written(filename)
     with open(filename, "w", encoding=encoding) as f:
         f.write(contents)
 
 
+def file_signature(filename):
+    """Return a signature of the file, so we can see if it has changed.
+
+    This is a tuple with the modification time, the size and a hash of the
+    contents.  When the file cannot be read, we return None.
+    """
+    try:
+        stat = os.stat(filename)
+        with open(filename, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, digest)
+
+
 def read_text_file(filename, encoding=None):
     """Return lines and encoding of the file
 
@@ -522,10 +679,10 @@ def show_interesting_lines(result):
     But: when there are errors or warnings, print everything.
     And if there is a non-zero exit code, ask the user if she wants to continue.
     """
-    if Fore.RED in result:
+    if has_errors(result):
         # warnings/errors, print complete result.
         print(result)
-        if ERROR_EXIT_CODE in result:
+        if has_exit_code(result):
             if not ask(
                 "There were errors or warnings. Are you sure you want to continue?",
                 default=False,
@@ -659,6 +816,8 @@ def run_hooks(zest_releaser_config, which_releaser, when, data):
                 # Resolve the hook or fail with ImportError.
                 hooks.append(resolve_name(hook_name))
 
+            if hooks:
+                mark_unknown_writes()
             for hook in hooks:
                 hook(data)
         finally:
@@ -681,6 +840,9 @@ def run_entry_points(which_releaser, when, data):
     for entrypoint in entry_points(group=group):
         # Grab the function that is the actual plugin.
         plugin = entrypoint.load()
+        if not entrypoint.value.startswith("zest.releaser."):
+            # Our own plugins use write_text_file, others we do not know.
+            mark_unknown_writes()
         # Feed the data dict to the plugin.
         plugin(data)
 
@@ -702,6 +864,8 @@ KNOWN_WARNINGS = [
 ]
 # Make them lowercase just to be sure.
 KNOWN_WARNINGS = [w.lower() for w in KNOWN_WARNINGS]
+# Compiled from KNOWN_WARNINGS plus the known-warnings option.
+_KNOWN_WARNINGS_RE = None
 # If we see a non-zero exit code, we add this in this output:
 ERROR_EXIT_CODE = "ERROR: exit code"
 
@@ -717,18 +881,115 @@ def format_command(command):
     return " ".join(args)
 
 
-def _execute_command(command, cwd=None, extra_environ=None, env=None):
-    """Execute a command, returning stdout, plus maybe parts of stderr."""
-    # Enforce the command to be a list or arguments.
-    assert isinstance(command, (list, tuple))
+def _git_subcommand(command):
+    """Return the git subcommand, like 'tag', and its arguments.
+
+    For other commands we return None and an empty list.
+    """
+    if not command or os.path.basename(command[0]) != "git":
+        return None, []
+    args = list(command[1:])
+    # Skip global options like '-c name=value'.
+    while args and args[0].startswith("-"):
+        option = args.pop(0)
+        if option in ("-c", "-C") and args:
+            args.pop(0)
+    if not args:
+        return None, []
+    return args[0], args[1:]
+
+
+def is_read_only_command(command):
+    """Is this a git command that does not change anything?
+
+    Listing tags is fine, creating tags is not.  The same is true for
+    reading and writing the configuration.  We only look at git commands:
+    for any other command we cannot be sure.
+    """
+    subcommand, args = _git_subcommand(command)
+    if subcommand is None:
+        return False
+    if subcommand == "tag":
+        return not args or args[0] in ("-l", "--list")
+    if subcommand == "config":
+        return bool(args) and args[0] in (
+            "--get",
+            "--get-all",
+            "--get-regexp",
+            "-l",
+            "--list",
+        )
+    if subcommand == "symbolic-ref":
+        # Reading needs one name, with a second one it changes the ref.
+        if any(arg in ("-d", "--delete", "-m") for arg in args):
+            return False
+        return len([arg for arg in args if not arg.startswith("-")]) == 1
+    return subcommand in READ_ONLY_GIT_COMMANDS
+
+
+def is_metadata_command(command):
+    """Is this a setup.py command that only asks for metadata?
+
+    ``setup.py egg_info`` writes the ``.egg-info`` directory, but that is
+    not in version control, so the status of the checkout stays the same.
+    We do not remember the output, as it changes when setup.py changes.
+    """
+    return (
+        len(command) == 3
+        and list(command[:2]) == [sys.executable, "setup.py"]
+        and command[2] in SETUP_PY_METADATA_ARGUMENTS
+    )
+
+
+def command_environment(extra_environ=None, pythonpath=True):
+    """Return the environment for running a command.
+
+    This is a copy of ``os.environ``, with PYTHONPATH set to our
+    ``sys.path`` when pythonpath is true, and updated with extra_environ.
+
+    Making this environment for every command is wasteful, so we make
+    each combination only once, until ``os.environ`` or ``sys.path``
+    changes.  We keep the last MAX_ENVIRONMENTS combinations.  Treat the
+    result as read-only: it is shared.
+    """
+    global _ENVIRONMENT_SOURCE
+    source = (dict(os.environ), list(sys.path))
+    key = (pythonpath, tuple(sorted((extra_environ or {}).items())))
+    with _ENVIRONMENTS_LOCK:
+        if _ENVIRONMENT_SOURCE != source:
+            _ENVIRONMENT_SOURCE = source
+            _ENVIRONMENTS.clear()
+        env = _ENVIRONMENTS.get(key)
+        if env is not None:
+            _ENVIRONMENTS.move_to_end(key)
+            return env
+        env = dict(source[0])
+        if pythonpath:
+            env["PYTHONPATH"] = os.pathsep.join(sys.path)
+        if extra_environ:
+            env.update(extra_environ)
+        _ENVIRONMENTS[key] = env
+        while len(_ENVIRONMENTS) > MAX_ENVIRONMENTS:
+            _ENVIRONMENTS.popitem(last=False)
+        return env
+
+
+def _is_python_command(command):
+    name = os.path.basename(command[0])
+    return command[0].startswith(sys.executable) or name.startswith("python")
+
+
+def _command_env(command, extra_environ=None, env=None):
     if extra_environ and env:
         raise ValueError("You cannot pass both 'extra_environ' and 'env'.")
-    logger.debug("Running command: '%s'", format_command(command))
     if env is None:
-        env = os.environ.copy()
-        env["PYTHONPATH"] = os.pathsep.join(sys.path)
-        if extra_environ is not None:
-            env.update(extra_environ)
+        pythonpath = PYTHONPATH_FOR_ALL_COMMANDS or _is_python_command(command)
+        env = command_environment(extra_environ=extra_environ, pythonpath=pythonpath)
+    return env
+
+
+def _show_stderr(command):
+    """Should we show the stderr of this command when it succeeds?"""
     # By default we show errors, of course.
     show_stderr = True
     if command[0].startswith(sys.executable):
@@ -742,6 +1003,42 @@ def _execute_command(command, cwd=None, extra_environ=None, env=None):
             if flag in command:
                 show_stderr = True
                 break
+    return show_stderr
+
+
+def _execute_command(command, cwd=None, extra_environ=None, env=None):
+    """Execute a command, returning stdout, plus maybe parts of stderr.
+
+    When a command_cache is active, we remember the output of read-only
+    commands.
+    """
+    # Enforce the command to be a list or arguments.
+    assert isinstance(command, (list, tuple))
+    if not is_read_only_command(command):
+        if not is_metadata_command(command):
+            mark_changed()
+    elif _COMMAND_CACHE is not None and not (extra_environ or env):
+        key = (tuple(command), os.path.abspath(cwd or os.getcwd()))
+        result = _COMMAND_CACHE.get(key)
+        if result is not None:
+            _COMMAND_CACHE_STATS["hit"] += 1
+            logger.debug("Using cached output of '%s'", format_command(command))
+            return result
+        _COMMAND_CACHE_STATS["miss"] += 1
+        counter = _CHANGE_COUNTER
+        result = _run_command(command, cwd=cwd)
+        # Something may have changed while the command was running.
+        if _COMMAND_CACHE is not None and counter == _CHANGE_COUNTER:
+            _COMMAND_CACHE[key] = result
+        return result
+    return _run_command(command, cwd=cwd, extra_environ=extra_environ, env=env)
+
+
+def _run_command(command, cwd=None, extra_environ=None, env=None):
+    """Run the command, without looking in the command cache."""
+    env = _command_env(command, extra_environ=extra_environ, env=env)
+    logger.debug("Running command: '%s'", format_command(command))
+    show_stderr = _show_stderr(command)
     process_kwargs = {
         "stdin": subprocess.PIPE,
         "stdout": subprocess.PIPE,
@@ -754,14 +1051,18 @@ def _execute_command(command, cwd=None, extra_environ=None, env=None):
     if process.returncode or show_stderr or "Traceback" in process.stderr:
         # Some error occurred.  Or everything is fine, but the command
         # prints to stderr anyway.
+        counts = collections.Counter()
+        errors = get_errors(process.stderr, counts)
         if process.returncode:
-            return (
+            return CommandOutput(
                 Fore.RED
                 + f"{ERROR_EXIT_CODE} {process.returncode}.\n"
                 + process.stdout
-                + get_errors(process.stderr)
+                + errors,
+                returncode=process.returncode,
+                counts=counts,
             )
-        return process.stdout + get_errors(process.stderr)
+        return CommandOutput(process.stdout + errors, counts=counts)
     # Only return the stdout. Stderr only contains possible
     # weird/confusing warnings that might trip up extraction of version
     # numbers and so.
@@ -771,10 +1072,80 @@ def _execute_command(command, cwd=None, extra_environ=None, env=None):
             format_command(process.args),
             process.stderr,
         )
-    return process.stdout
+    return CommandOutput(process.stdout)
+
+
+def stream_command(command, cwd=None):
+    """Run the command and print its output while it runs.
+
+    Use this for commands with a lot of output, like a diff: the output is
+    not kept in memory.  When standard output is a terminal, the command
+    writes to it directly, so git can use its pager, for example the one
+    in ``$PAGER``.  Errors are printed like in ``execute_command``.
+
+    We return the exit code.
+    """
+    assert isinstance(command, (list, tuple))
+    if not is_read_only_command(command):
+        mark_changed()
+    logger.debug("Running command: '%s'", format_command(command))
+    # A pipe for stderr could fill up while we are reading stdout.
+    with tempfile.TemporaryFile() as stderr:
+        if sys.stdout.isatty():
+            sys.stdout.flush()
+            returncode = subprocess.call(command, cwd=cwd, stderr=stderr)
+        else:
+            process = subprocess.Popen(
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                errors="replace",
+            )
+            with process.stdout:
+                for line in process.stdout:
+                    sys.stdout.write(line)
+            returncode = process.wait()
+        stderr.seek(0)
+        errors = stderr.read().decode(errors="replace")
+    if returncode:
+        print(Fore.RED + f"{ERROR_EXIT_CODE} {returncode}.")
+    if errors.strip():
+        print(get_errors(errors))
+    return returncode
+
+
+def set_known_warnings(extra_warnings=()):
+    """Use these warnings in addition to KNOWN_WARNINGS.
+
+    All warnings are combined in one regular expression, so for each line
+    of stderr output we only need one check.
+    """
+    global _KNOWN_WARNINGS_RE
+    warnings = {w.strip().lower() for w in KNOWN_WARNINGS + list(extra_warnings)}
+    warnings.discard("")
+    if not warnings:
+        # A regular expression that never matches.
+        _KNOWN_WARNINGS_RE = re.compile(r"(?!)")
+        return
+    pattern = "|".join(re.escape(w) for w in sorted(warnings))
+    _KNOWN_WARNINGS_RE = re.compile(pattern, re.IGNORECASE)
 
 
-def get_errors(stderr_output):
+def is_known_warning(line):
+    """Does this line start with one of the known warnings?"""
+    if _KNOWN_WARNINGS_RE is None:
+        set_known_warnings()
+    return _KNOWN_WARNINGS_RE.match(line) is not None
+
+
+def get_errors(stderr_output, counts=None):
+    """Return the stderr output with each line marked as error or warning.
+
+    When you pass a ``collections.Counter`` as counts, we count the
+    ``error``, ``warning`` and ``empty`` lines in it.
+    """
     # Some error occurred.  Return the relevant output.
     # print(Fore.RED + stderr_output)
     stderr_output = stderr_output.strip()
@@ -786,36 +1157,255 @@ def get_errors(stderr_output):
     # as an error: warning: no previously-included files
     # matching '*.pyc' found anywhere in distribution.  Same
     # for empty lines.  So try to be smart about it.
-    errors = []
-    for line in stderr_output.split("\n"):
-        line = line.strip()
-        if not line:
-            # Keep it in the errors, but do not mark it with a color.
-            errors.append(line)
-            continue
-        for known in KNOWN_WARNINGS:
-            if line.lower().startswith(known):
-                # Not a real error, so mark it as a warning.
-                errors.append(Fore.MAGENTA + line)
-                break
-        else:
-            # Not found in known warnings, so mark it as an error.
-            errors.append(Fore.RED + line)
+    errors = [mark_error_line(line, counts) for line in stderr_output.split("\n")]
     return "\n".join(errors)
 
 
+def classify_error_line(line):
+    """Return if a line of stderr output is an error, warning or empty."""
+    line = line.strip()
+    if not line:
+        return "empty"
+    if is_known_warning(line):
+        return "warning"
+    return "error"
+
+
+def mark_error_line(line, counts=None):
+    """Mark a line of stderr output as error or as warning."""
+    line = line.strip()
+    kind = classify_error_line(line)
+    if counts is not None:
+        counts[kind] += 1
+    if kind == "empty":
+        # Keep it in the errors, but do not mark it with a color.
+        return line
+    if kind == "warning":
+        # Not a real error, so mark it as a warning.
+        return Fore.MAGENTA + line
+    # Not found in known warnings, so mark it as an error.
+    return Fore.RED + line
+
+
+class CommandOutput(str):
+    """The output of a command, as returned by execute_command.
+
+    This is a string, like before, so you can print it or search in it.
+    But you do not need to look for colors to know what went wrong:
+    ``returncode`` is the exit code of the command, and ``counts`` has
+    the number of ``error``, ``warning`` and ``empty`` lines of stderr.
+    When stderr is not part of the output, nothing is counted.
+    """
+
+    def __new__(cls, text, returncode=0, counts=None):
+        result = super().__new__(cls, text)
+        result.returncode = returncode
+        result.counts = collections.Counter(counts or {})
+        return result
+
+    @property
+    def errors(self):
+        return self.counts["error"]
+
+    @property
+    def warnings(self):
+        return self.counts["warning"]
+
+
+def has_errors(result):
+    """Does the output of a command have errors?"""
+    if isinstance(result, CommandOutput):
+        return bool(result.returncode or result.errors)
+    return Fore.RED in result
+
+
+def has_exit_code(result):
+    """Did the command exit with a non-zero exit code?"""
+    if isinstance(result, CommandOutput):
+        return bool(result.returncode)
+    return ERROR_EXIT_CODE in result
+
+
+class BoundedLines:
+    """The first and last lines of some output.
+
+    We keep ``head`` lines from the start, and ``tail`` lines from the end.
+    The lines in between are only counted.  This way the memory we use does
+    not depend on how much output a command gives.
+    """
+
+    def __init__(self, head=100, tail=400):
+        self.head_size = head
+        self.head = []
+        self.tail = collections.deque(maxlen=tail)
+        self.skipped = 0
+
+    def append(self, line):
+        if len(self.head) < self.head_size:
+            self.head.append(line)
+            return
+        if len(self.tail) == self.tail.maxlen:
+            self.skipped += 1
+        self.tail.append(line)
+
+    def lines(self):
+        result = list(self.head)
+        if self.skipped:
+            result.append(f"... ({self.skipped} lines not shown) ...")
+        result.extend(self.tail)
+        return result
+
+    def __len__(self):
+        return len(self.head) + self.skipped + len(self.tail)
+
+
+def _stream_command(command, cwd=None, extra_environ=None, env=None, log_file=None):
+    """Execute a command, while reading its output.
+
+    The result is the same as for _execute_command, but for commands with
+    lots of output we only keep the first and last lines of stdout and
+    stderr, see BoundedLines.  Lines of stderr are marked as errors or
+    warnings while they come in.
+
+    In verbose mode we print all output while the command runs.  With a
+    log_file, we append all output to this file.
+    """
+    assert isinstance(command, (list, tuple))
+    if not is_read_only_command(command):
+        mark_changed()
+    env = _command_env(command, extra_environ=extra_environ, env=env)
+    logger.debug("Running command: '%s'", format_command(command))
+    show_stderr = _show_stderr(command)
+    stdout = BoundedLines()
+    stderr = BoundedLines()
+    counts = collections.Counter()
+    traceback = []
+    relay_lock = threading.Lock()
+    log = None
+
+    def relay(line):
+        with relay_lock:
+            if VERBOSE:
+                sys.stdout.write(line)
+            if log is not None:
+                log.write(line)
+
+    def read_stdout(stream):
+        for line in stream:
+            relay(line)
+            stdout.append(line.rstrip("\n"))
+
+    def read_stderr(stream):
+        for line in stream:
+            relay(line)
+            if not traceback and "Traceback" in line:
+                traceback.append(line)
+            stderr.append(mark_error_line(line, counts))
+
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        text=True,
+        errors="replace",
+    )
+    readers = [
+        threading.Thread(target=read_stdout, args=(process.stdout,)),
+        threading.Thread(target=read_stderr, args=(process.stderr,)),
+    ]
+    try:
+        if log_file:
+            log = open(log_file, "a", errors="replace")
+            log.write(f"$ {format_command(command)}\n")
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+        if log is not None:
+            log.close()
+    output = "".join(line + "\n" for line in stdout.lines())
+    errors = stderr.lines()
+    # Like get_errors, leave out empty lines at the start and end.
+    while errors and not errors[0]:
+        errors.pop(0)
+    while errors and not errors[-1]:
+        errors.pop()
+    if returncode:
+        return CommandOutput(
+            Fore.RED
+            + f"{ERROR_EXIT_CODE} {returncode}.\n"
+            + output
+            + "\n".join(errors),
+            returncode=returncode,
+            counts=counts,
+        )
+    if show_stderr or traceback:
+        return CommandOutput(output + "\n".join(errors), counts=counts)
+    if errors:
+        logger.debug(
+            "Stderr of running command '%s':\n%s",
+            format_command(command),
+            "\n".join(errors),
+        )
+    return CommandOutput(output)
+
+
+def run_concurrently(functions):
+    """Call the functions at the same time, and return their results.
+
+    Use this for independent functions that mostly wait for a command,
+    like asking git for the status while setup.py gives us the version.
+    The functions must not ask the user anything.
+
+    We wait until all functions are done.  When one of them raises an
+    exception, we raise it here.
+    """
+    functions = list(functions)
+    if len(functions) < 2:
+        return [function() for function in functions]
+    with concurrent.futures.ThreadPoolExecutor(len(functions)) as executor:
+        futures = [executor.submit(function) for function in functions]
+    return [future.result() for future in futures]
+
+
 def execute_command(
-    command, allow_retry=False, fail_message="", cwd=None, extra_environ=None, env=None
+    command,
+    allow_retry=False,
+    fail_message="",
+    cwd=None,
+    extra_environ=None,
+    env=None,
+    stream=False,
+    log_file=None,
+    check=True,
 ):
     """Run the command and possibly retry it.
 
     When allow_retry is False, we simply call the base
-    _execute_command and return the result.
+    _execute_command and return the result.  When the command fails, we
+    ask if you want to continue.  With check False we do not ask, and you
+    can look at the result with has_exit_code.
+
+    With stream, we read the output while the command runs, and only keep
+    the start and end of it, see _stream_command.  Use this for commands
+    that can give a lot of output, like building a package.  This can log
+    all output to log_file.
 
     When allow_retry is True, a few things change.
 
     You can either pass extra_environ options that we then add to a copy of the
-    current OS environment, plus we add the PYTHONPATH.
+    current OS environment, plus we add the PYTHONPATH, see command_environment.
     Or you can pass your own env.
     You can only use one of these two options.
 
@@ -832,9 +1422,20 @@ def execute_command(
 
     It might be a warning, but we cannot detect the distinction.
     """
-    result = _execute_command(command, cwd=cwd, extra_environ=extra_environ, env=env)
+    if stream:
+        result = _stream_command(
+            command,
+            cwd=cwd,
+            extra_environ=extra_environ,
+            env=env,
+            log_file=log_file,
+        )
+    else:
+        result = _execute_command(
+            command, cwd=cwd, extra_environ=extra_environ, env=env
+        )
     if not allow_retry:
-        if ERROR_EXIT_CODE in result:
+        if check and has_exit_code(result):
             print(result)
             if not ask(
                 "There were errors or warnings. Are you sure you want to continue?",
@@ -848,12 +1449,12 @@ def execute_command(
     # At this point, a retry is allowed.  We only do this for very few commands.
     if AUTO_RESPONSE:
         # Retry is not possible with auto response, so just return the result.
-        if ERROR_EXIT_CODE in result:
+        if has_exit_code(result):
             # This is a real error, and the user cannot react.  We quit.
             print(result)
             sys.exit(1)
         return result
-    if Fore.RED not in result or ERROR_EXIT_CODE not in result:
+    if not has_errors(result) or not has_exit_code(result):
         show_interesting_lines(result)
         return result
     # There are warnings or errors. Print the complete result.
@@ -864,7 +1465,16 @@ def execute_command(
     retry = retry_yes_no(command)
     if retry:
         logger.info("Retrying command: '%s'", format_command(command))
-        return execute_command(command, allow_retry=True)
+        return execute_command(
+            command,
+            allow_retry=True,
+            fail_message=fail_message,
+            cwd=cwd,
+            extra_environ=extra_environ,
+            env=env,
+            stream=stream,
+            log_file=log_file,
+        )
     # Accept the error, continue with the program.
     return result
 
@@ -928,6 +1538,121 @@ def retry_yes_no(command):
             print(explanation)
 
 
+# Parsed tags: {(tag, tag format): (version, parsed version) or None}
+_PARSED_TAGS = {}
+# The last TagIndex that we made: ((tags, tag format), index)
+_TAG_INDEX_CACHE = None
+
+
+def _tag_format_regex(tag_format):
+    """Return a regular expression that gets the version from a tag."""
+    prefix, _, suffix = tag_format.partition("{version}")
+    prefix = prefix.replace("{{", "{").replace("}}", "}")
+    suffix = suffix.replace("{{", "{").replace("}}", "}")
+    return re.compile(re.escape(prefix) + "(?P<version>.+)" + re.escape(suffix) + "$")
+
+
+def _parse_tag(tag, tag_format):
+    """Return the version and parsed version of the tag, or None.
+
+    We remember the result, also when the tag cannot be parsed.  This way we
+    only log about such a tag once.
+    """
+    key = (tag, tag_format)
+    if key in _PARSED_TAGS:
+        return _PARSED_TAGS[key]
+    version = tag
+    match = _tag_format_regex(tag_format).match(tag)
+    if match:
+        version = match.group("version")
+    try:
+        result = (version, parse_version(version))
+    except InvalidVersion:
+        logger.debug("Could not parse version: %s", tag)
+        result = None
+    _PARSED_TAGS[key] = result
+    return result
+
+
+def tag_format_glob(tag_format):
+    """Return a glob pattern that matches all tags in this format.
+
+    Special characters are put in brackets, which works both for git and
+    for the fnmatch module.
+    """
+    parts = []
+    for part in tag_format.split("{version}", 1):
+        part = part.replace("{{", "{").replace("}}", "}")
+        parts.append(re.sub(r"([*?\[])", r"[\1]", part))
+    return "*".join(parts)
+
+
+def version_from_tag(tag, tag_format="{version}"):
+    """Return the version that this tag is for.
+
+    With tag format ``v{version}``, tag ``v1.2`` is for version ``1.2``.
+    When the tag does not match the format, we return the tag itself.
+    """
+    match = _tag_format_regex(tag_format).match(tag)
+    if match:
+        return match.group("version")
+    return tag
+
+
+class TagIndex:
+    """Tags sorted by the version they are for.
+
+    Each tag is parsed only once per process.  Tags that are not a valid
+    version are left out.  We can then quickly find the tag for the greatest
+    version that is not greater than a given version.
+    """
+
+    def __init__(self, tags, tag_format="{version}"):
+        self.tag_format = tag_format
+        entries = []
+        for position, tag in enumerate(tags):
+            parsed = _parse_tag(tag, tag_format)
+            if parsed is None:
+                continue
+            entries.append((parsed[1], position, tag))
+        entries.sort()
+        self._versions = [entry[0] for entry in entries]
+        self._tags = [entry[2] for entry in entries]
+        self._parsed = {tag: parsed for parsed, position, tag in entries}
+
+    def __len__(self):
+        return len(self._tags)
+
+    def parsed_version(self, tag):
+        """Return the parsed version of the tag, or None if unknown."""
+        return self._parsed.get(tag)
+
+    def last_tag(self, version):
+        """Return the tag with the greatest version that is at most this one.
+
+        When several tags are for the same version, like ``1.0`` and
+        ``1.0.0``, we return the first one from the original list of tags.
+        """
+        parsed_version = parse_version(version)
+        index = bisect.bisect_right(self._versions, parsed_version)
+        if index == 0:
+            return None
+        # Go to the first tag with the same version.
+        index = bisect.bisect_left(self._versions, self._versions[index - 1])
+        return self._tags[index]
+
+
+def tag_index(tags, tag_format="{version}"):
+    """Return a TagIndex for these tags, reusing the previous one if possible."""
+    global _TAG_INDEX_CACHE
+    key = (tuple(tags), tag_format)
+    if _TAG_INDEX_CACHE is not None and _TAG_INDEX_CACHE[0] == key:
+        return _TAG_INDEX_CACHE[1]
+    index = TagIndex(tags, tag_format=tag_format)
+    _TAG_INDEX_CACHE = (key, index)
+    return index
+
+
 def get_last_tag(vcs, allow_missing=False):
     """Get last tag number, compared to current version.
 
@@ -939,7 +1664,19 @@ def get_last_tag(vcs, allow_missing=False):
     if not version:
         logger.critical("No version detected, so we can't do anything.")
         sys.exit(1)
-    available_tags = vcs.available_tags()
+    tag_format = vcs.zest_releaser_config.tag_format_template()
+    if vcs.zest_releaser_config.tag_lookup() == "reachable":
+        # Git finds the tag, so we only need to parse this one.
+        found = vcs.nearest_tag(tag_format_glob(tag_format))
+        parsed_tag = _parse_tag(found, tag_format) if found else None
+        if parsed_tag is not None and parsed_tag[1] <= parse_version(version):
+            logger.debug("Found nearest reachable tag: %s", found)
+            return found
+        logger.debug("No suitable reachable tag found, comparing versions.")
+    available_tags = vcs.available_tags(pattern=tag_format_glob(tag_format))
+    if not available_tags and tag_format != "{version}":
+        # Maybe the tags were made before the tag format was set.
+        available_tags = vcs.available_tags()
     if not available_tags:
         if allow_missing:
             logger.debug("No tags found.")
@@ -956,27 +1693,10 @@ def get_last_tag(vcs, allow_missing=False):
     # Note: if parsing the current version fails, there is nothing we can do:
     # there is no sane way of knowing which version is smaller than an unparsable
     # version, so we just break hard.
-    parsed_version = parse_version(version)
-    found = parsed_found = None
-    for tag in available_tags:
-        try:
-            parsed_tag = parse_version(tag)
-        except InvalidVersion:
-            logger.debug("Could not parse version: %s", tag)
-            continue
-        if parsed_tag == parsed_version:
-            found = tag
-            logger.debug("Found exact match: %s", found)
-            break
-        if parsed_tag >= parsed_version:
-            # too new tag, not interesting
-            continue
-        if found is not None and parsed_tag <= parsed_found:
-            # we already have a better match
-            continue
-        logger.debug("Found possible lower match: %s", tag)
-        found = tag
-        parsed_found = parsed_tag
+    index = tag_index(available_tags, tag_format)
+    found = index.last_tag(version)
+    if found is not None:
+        logger.debug("Found tag: %s", found)
     return found
 
 
@@ -1112,9 +1832,17 @@ def extract_zestreleaser_configparser(config, config_filename):
         "less-zeroes",
         "tag-signing",
         "run-pre-commit",
+        "git-fsmonitor",
+        "read-git-refs",
+        "setup-py-worker",
+        "sparse-checkout",
+        "verify-name",
+        "pythonpath-for-all-commands",
     ]
     integer_keys = [
         "version-levels",
+        "submodule-jobs",
+        "submodule-depth",
     ]
     for key, value in result.items():
         if key in boolean_keys:
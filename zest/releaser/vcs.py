@@ -1,6 +1,7 @@
-from configparser import ConfigParser
 from zest.releaser import pypi
+from zest.releaser import setuppy
 from zest.releaser import utils
+from zest.releaser.metadata import project_metadata
 
 import logging
 import os
@@ -8,14 +9,6 @@ import re
 import sys
 
 
-try:
-    # Python 3.11+
-    import tomllib
-except ImportError:
-    # Python 3.10-
-    import tomli as tomllib
-
-
 VERSION_PATTERN = re.compile(
     r"""
 ^                # Start of line
@@ -47,10 +40,80 @@ __version__\s*=\s*   # '__version__ =  ' with possible whitespace
 )
 
 TXT_EXTENSIONS = ["rst", "txt", "markdown", "md"]
+VERSION_FILENAMES = ["version"] + [
+    ".".join(["version", extension]) for extension in TXT_EXTENSIONS
+]
 
 logger = logging.getLogger(__name__)
 
 
+class VersionLocation:
+    """Where the version is defined, so we can change it there.
+
+    We find this out while reading the version.  When setting the version,
+    we can then change this line, instead of searching for it again.
+
+    ``kind`` is one of:
+
+    - ``python-file``: a ``__version__`` line in a Python file
+    - ``pyproject.toml``: the version in the ``[project]`` section
+    - ``setup.py``: a ``version=`` line in setup.py
+    - ``setup.py-uppercase``: a ``VERSION =`` line in setup.py
+    - ``setup.cfg``: the version in setup.cfg
+    - ``version-file``: a file like ``version.txt`` with only the version
+
+    For a version file the line number is None: we replace the whole file.
+    """
+
+    def __init__(self, filename, kind, line_number=None, quote="'", indentation=""):
+        self.filename = filename
+        self.kind = kind
+        self.line_number = line_number
+        self.quote = quote
+        self.indentation = indentation
+
+    @classmethod
+    def from_line(cls, filename, kind, line_number, line):
+        quote = '"' if '"' in line else "'"
+        indentation = line[: len(line) - len(line.lstrip())]
+        return cls(
+            filename,
+            kind,
+            line_number=line_number,
+            quote=quote,
+            indentation=indentation,
+        )
+
+    def __repr__(self):
+        if self.line_number is None:
+            return f"<VersionLocation {self.kind} {self.filename}>"
+        return (
+            f"<VersionLocation {self.kind} {self.filename} "
+            f"line {self.line_number + 1}>"
+        )
+
+    def version_line(self, version):
+        """Return the new contents of the version line."""
+        quote = self.quote
+        if self.kind == "python-file":
+            return f"__version__ = {quote}{version}{quote}"
+        if self.kind == "pyproject.toml":
+            return f"version = {quote}{version}{quote}"
+        if self.kind == "setup.py-uppercase":
+            return f"VERSION = {quote}{version}{quote}"
+        if self.kind == "setup.py":
+            if self.indentation.startswith(" "):
+                # oh, probably '    version = 1.0,' line.
+                # Note: no spaces around the '='.
+                return f"{self.indentation}version={quote}{version}{quote},"
+            return f"version = {quote}{version}{quote}"
+        if self.kind == "setup.cfg":
+            if self.indentation.startswith(" "):
+                return f"{self.indentation}version = {version}"
+            return f"version = {version}"
+        raise ValueError(f"No version line for {self.kind}")
+
+
 class BaseVersionControl:
     "Shared implementation between all version control systems"
 
@@ -73,6 +136,10 @@ class BaseVersionControl:
             )
         else:
             self.zest_releaser_config = pypi.ZestReleaserConfig()
+        # Cached result of _extract_version, see there.
+        self._version_cache = None
+        # Cached result of _file_index, see there.
+        self._file_index_cache = None
 
     def __repr__(self):
         return f"<{self.__class__.__name__} at {self.reporoot} {self.relative_path_in_repo}>"
@@ -86,6 +153,14 @@ class BaseVersionControl:
 
     def get_setup_py_version(self):
         if os.path.exists("setup.py"):
+            # Most setup.py files have a literal version, so try that first.
+            version = setuppy.static_metadata("version")
+            if version:
+                return utils.strip_version(version)
+            if self.zest_releaser_config.setup_py_worker():
+                version = setuppy.worker_metadata("version")
+                if version:
+                    return utils.strip_version(version)
             # First run egg_info, as that may get rid of some warnings
             # that otherwise end up in the extracted version, like
             # UserWarnings.
@@ -102,6 +177,13 @@ class BaseVersionControl:
 
     def get_setup_py_name(self):
         if os.path.exists("setup.py"):
+            name = setuppy.static_metadata("name")
+            if name:
+                return name.strip()
+            if self.zest_releaser_config.setup_py_worker():
+                name = setuppy.worker_metadata("name")
+                if name:
+                    return name.strip()
             # First run egg_info, as that may get rid of some warnings
             # that otherwise end up in the extracted name, like
             # UserWarnings.
@@ -109,19 +191,15 @@ class BaseVersionControl:
             return utils.execute_command(utils.setup_py("--name")).strip()
 
     def get_setup_cfg_name(self):
-        if os.path.exists("setup.cfg"):
-            setup_cfg = ConfigParser()
-            setup_cfg.read("setup.cfg")
+        setup_cfg = project_metadata.setup_cfg()
+        if setup_cfg is not None:
             try:
                 return setup_cfg["metadata"]["name"]
             except KeyError:
                 return None
 
     def get_version_txt_version(self):
-        filenames = ["version"]
-        for extension in TXT_EXTENSIONS:
-            filenames.append(".".join(["version", extension]))
-        version_file = self.filefind(filenames)
+        version_file = self.filefind(VERSION_FILENAMES)
         if version_file:
             with open(version_file) as f:
                 version = f.read()
@@ -143,21 +221,48 @@ class BaseVersionControl:
                 return utils.strip_version(line)
 
     def get_pyproject_toml_version(self):
-        if not os.path.exists("pyproject.toml"):
+        result = project_metadata.pyproject_toml()
+        if result is None:
             return
-        with open("pyproject.toml", "rb") as myfile:
-            result = tomllib.load(myfile)
         # Might be None, but that is fine.
         return result.get("project", {}).get("version")
 
     def get_pyproject_toml_name(self):
-        if not os.path.exists("pyproject.toml"):
+        result = project_metadata.pyproject_toml()
+        if result is None:
             return
-        with open("pyproject.toml", "rb") as myfile:
-            result = tomllib.load(myfile)
         # Might be None, but that is fine.
         return result.get("project", {}).get("name")
 
+    def _file_index_key(self):
+        """Return a key that changes when the list of files changes.
+
+        We use this to cache the file index.  None means: do not cache.
+        """
+        return None
+
+    def _file_index(self):
+        """Return an index of the files in version control.
+
+        This maps the lowercase base name of each file to a list of
+        (position, path) tuples, where position is the place of the path in
+        ``list_files``.  Listing all files can be slow in a big repository,
+        so when the version control system can tell us that the list has not
+        changed, we reuse the index.
+        """
+        key = self._file_index_key()
+        if key is not None and self._file_index_cache is not None:
+            cached_key, index = self._file_index_cache
+            if cached_key == key:
+                return index
+        index = {}
+        for position, fullpath in enumerate(self.list_files()):
+            filename = os.path.basename(fullpath).lower()
+            index.setdefault(filename, []).append((position, fullpath))
+        if key is not None:
+            self._file_index_cache = (key, index)
+        return index
+
     def filefind(self, names):
         """Return first found file matching name (case-insensitive).
 
@@ -171,28 +276,30 @@ class BaseVersionControl:
         """
         if isinstance(names, str):
             names = [names]
-        names = [name.lower() for name in names]
-        files = self.list_files()
+        index = self._file_index()
+        candidates = []
+        for name in {name.lower() for name in names}:
+            candidates.extend(index.get(name, []))
+        # Keep the order of the list of files.
+        candidates.sort()
         found = []
-        for fullpath in files:
+        for position, fullpath in candidates:
             if fullpath.lower().endswith("debian/changelog"):
                 logger.debug(
                     "Ignoring %s, unreadable (for us) debian changelog", fullpath
                 )
                 continue
-            filename = os.path.basename(fullpath)
-            if filename.lower() in names:
-                logger.debug("Found %s", fullpath)
-                if not os.path.exists(fullpath):
-                    # Strange.  It at least happens in the tests when
-                    # we deliberately remove a CHANGES.txt file.
-                    logger.warning(
-                        "Found file %s in version control but not on "
-                        "file execute_command.",
-                        fullpath,
-                    )
-                    continue
-                found.append(fullpath)
+            logger.debug("Found %s", fullpath)
+            if not os.path.exists(fullpath):
+                # Strange.  It at least happens in the tests when
+                # we deliberately remove a CHANGES.txt file.
+                logger.warning(
+                    "Found file %s in version control but not on "
+                    "file execute_command.",
+                    fullpath,
+                )
+                continue
+            found.append(fullpath)
         if not found:
             return
         if len(found) > 1:
@@ -229,9 +336,95 @@ class BaseVersionControl:
                 return True
         return False
 
+    def clear_caches(self):
+        """Forget cached information about the project.
+
+        We notice ourselves when the files with version information change.
+        But if you change things behind our back, for example by replacing
+        one of our methods in a test, you should call this.
+        """
+        self._version_cache = None
+        self._file_index_cache = None
+
+    def prefetch(self, status=True, version=True, tags=False):
+        """Get information that we are going to need, at the same time.
+
+        Getting the status of the checkout, the version and the tags each
+        may need a command.  These are independent, so we run them
+        together.  The results are cached, so the real questions later on
+        are answered right away.
+        """
+        functions = []
+        if status:
+            functions.append(self.is_clean_checkout)
+        if version:
+            functions.append(self._extract_version)
+        if tags:
+            functions.append(self._prefetch_tags)
+        utils.run_concurrently(functions)
+
+    def _prefetch_tags(self):
+        """Get the tags, so a command cache can remember them."""
+        self.available_tags()
+
+    def _version_sources(self):
+        """Return the files that may contain the version.
+
+        We cache the version as long as none of these files change.
+        """
+        sources = ["setup.py", "setup.cfg", "pyproject.toml"]
+        python_file = self.zest_releaser_config.python_file_with_version()
+        if python_file:
+            sources.append(python_file)
+        version_file = self.filefind(VERSION_FILENAMES)
+        if version_file:
+            sources.append(version_file)
+        return sources
+
+    def _sources_signature(self, sources):
+        """Return signature of the current directory and the source files."""
+        return (
+            os.getcwd(),
+            tuple(utils.file_signature(source) for source in sources),
+        )
+
     def _extract_version(self):
+        """Extract the version, or get it from the cache.
+
+        Getting the version can be expensive, for example when we need to
+        run setup.py.  So we remember the version, and the files it may have
+        been read from.  As long as those files do not change, and we are
+        still in the same directory, we return the cached version.
+        """
+        return self._version_and_location()[0]
+
+    def _cached_version(self):
+        """Return the cached version and location, if still valid, or None."""
+        if self._version_cache is None:
+            return None
+        sources, signature, version, location = self._version_cache
+        if self._sources_signature(sources) != signature:
+            return None
+        return version, location
+
+    def _version_and_location(self):
+        """Return the version and the VersionLocation, possibly cached."""
+        cached = self._cached_version()
+        if cached is not None:
+            logger.debug("Using cached version %s.", cached[0])
+            return cached
+        sources = self._version_sources()
+        signature = self._sources_signature(sources)
+        version, location = self._find_version()
+        self._version_cache = (sources, signature, version, location)
+        return version, location
+
+    def _find_version(self):
         """Extract the version from setup.py or version.txt or similar.
 
+        Return the version and the location where we can change it.  Both
+        may be None.
+
         If there is a setup.py and it gives back a version that differs
         from version.txt then this version.txt is not the one we should
         use.  This can happen in packages like ZopeSkel that have one or
@@ -243,47 +436,71 @@ class BaseVersionControl:
         But if there's an explicitly configured Python file that has to be
         searched for a ``__version__`` attribute, use that one.
         """
-        return (
-            self.get_python_file_version()
-            or self.get_pyproject_toml_version()
-            or self.get_setup_py_version()
-            or self.get_version_txt_version()
-        )
-
-    def _extract_name(self):
-        """Extract the package name from setup.py or pyproject.toml or similar."""
-        return (
-            self.get_setup_py_name()
-            or self.get_setup_cfg_name()
-            or self.get_pyproject_toml_name()
-        )
+        version = self.get_python_file_version()
+        if version:
+            return version, self._locate_python_file_version()
+        version = self.get_pyproject_toml_version()
+        if version:
+            return version, self._locate_pyproject_toml_version()
+        version = self.get_setup_py_version()
+        location = self._locate_version_file(version)
+        if location is not None:
+            return version or self.get_version_txt_version(), location
+        if not version:
+            return version, None
+        return version, self._locate_setup_py_version()
+
+    def _probe_version_location(self):
+        """Find out where to change the version, without reading it first.
+
+        This follows the same order as ``_find_version``, but only runs
+        setup.py when we need to compare its version with a version.txt.
+        """
+        if self.get_python_file_version():
+            return self._locate_python_file_version()
+        if self.get_pyproject_toml_version():
+            return self._locate_pyproject_toml_version()
+        if self.filefind(VERSION_FILENAMES):
+            location = self._locate_version_file(self.get_setup_py_version())
+            if location is not None:
+                return location
+        return self._locate_setup_py_version()
 
-    def _update_python_file_version(self, version):
+    def _locate_python_file_version(self):
         filename = self.zest_releaser_config.python_file_with_version()
-        lines, encoding = utils.read_text_file(
-            filename,
+        return self._locate_version_line(
+            filename, "python-file", UNDERSCORED_VERSION_PATTERN
         )
-        good_version = "__version__ = '%s'" % version
-        for index, line in enumerate(lines):
-            if UNDERSCORED_VERSION_PATTERN.search(line):
-                lines[index] = (
-                    good_version.replace("'", '"') if '"' in line else good_version
-                )
 
-        contents = "\n".join(lines)
-        utils.write_text_file(filename, contents, encoding)
-        logger.info("Set __version__ in %s to '%s'", filename, version)
+    def _locate_version_file(self, setup_py_version):
+        """Return the location of a version.txt file, if we should use it.
+
+        We have a version.txt file but does it match the setup.py version
+        (if any)?
+        """
+        versionfile = self.filefind(VERSION_FILENAMES)
+        if not versionfile:
+            return None
+        if setup_py_version and setup_py_version != self.get_version_txt_version():
+            return None
+        return VersionLocation(versionfile, "version-file")
+
+    def _locate_version_line(self, filename, kind, pattern):
+        """Return the location of the first line matching the pattern."""
+        if not os.path.exists(filename):
+            return None
+        lines, encoding = utils.read_text_file(filename)
+        for line_number, line in enumerate(lines):
+            if pattern.search(line):
+                logger.debug("Matching version line found: '%s'", line)
+                return VersionLocation.from_line(filename, kind, line_number, line)
+        return None
 
-    def _update_pyproject_toml_version(self, version):
-        # This is only called when get_pyproject_toml_version sees a version.
+    def _locate_pyproject_toml_version(self):
         filename = "pyproject.toml"
-        lines, encoding = utils.read_text_file(
-            filename,
-        )
-        good_version = "version = '%s'" % version
+        lines, encoding = utils.read_text_file(filename)
         found_project = False
-        found_version = False
-        for index, line in enumerate(lines):
+        for line_number, line in enumerate(lines):
             line = line.strip()
             # First look for '[project]'.
             if line == "[project]":
@@ -297,114 +514,136 @@ class BaseVersionControl:
                 break
             if not line.replace(" ", "").startswith("version="):
                 continue
-            # We found the version line!
-            lines[index] = (
-                good_version.replace("'", '"') if '"' in line else good_version
+            # We found the version line!  We do not keep the indentation.
+            return VersionLocation.from_line(
+                filename, "pyproject.toml", line_number, line
             )
-            found_version = True
+        return None
 
-        if not found_version:
-            logger.error(
-                "We could read a version from %s, "
-                "but could not write it back. See "
-                "https://zestreleaser.readthedocs.io/en/latest/versions.html "
-                "for hints.",
-                filename,
-            )
-            raise RuntimeError("Cannot set version")
+    def _locate_setup_py_version(self):
+        """Find the version line in setup.py or else setup.cfg.
 
-        contents = "\n".join(lines)
-        utils.write_text_file(filename, contents, encoding)
-        logger.info("Set version in %s to '%s'", filename, version)
+        The version may have come from running setup.py, but we find it
+        by simply reading the files.
+        """
+        if os.path.exists("setup.py"):
+            setup_lines, encoding = utils.read_text_file("setup.py")
+            for line_number, line in enumerate(setup_lines):
+                if VERSION_PATTERN.search(line):
+                    logger.debug("Matching version line found: '%s'", line)
+                    return VersionLocation.from_line(
+                        "setup.py", "setup.py", line_number, line
+                    )
+                if UPPERCASE_VERSION_PATTERN.search(line):
+                    # This one only occurs in the first column, so no need to
+                    # handle indentation.
+                    logger.debug("Matching version line found: '%s'", line)
+                    return VersionLocation.from_line(
+                        "setup.py", "setup.py-uppercase", line_number, line
+                    )
+        location = self._locate_version_line("setup.cfg", "setup.cfg", VERSION_PATTERN)
+        if location is not None:
+            # Quotes are not used in setup.cfg.
+            location.quote = ""
+        return location
+
+    def _name_getters(self):
+        """Return the sources of the package name, cheapest first.
+
+        For setup.cfg and pyproject.toml we only need to read a file.  For
+        setup.py we may need to run it, which is slow.  This is also the
+        order in which setuptools lets them override each other.
+        """
+        return [
+            ("setup.cfg", self.get_setup_cfg_name),
+            ("pyproject.toml", self.get_pyproject_toml_name),
+            ("setup.py", self.get_setup_py_name),
+        ]
+
+    def get_names(self):
+        """Return the package names from all sources, cheapest first.
+
+        This is a list of (source, name) tuples.  Sources without a name
+        are left out.
+        """
+        names = []
+        for source, getter in self._name_getters():
+            name = getter()
+            if name:
+                names.append((source, name))
+        return names
+
+    def _extract_name(self):
+        """Extract the package name from setup.cfg or pyproject.toml or similar.
+
+        We stop at the first source that has a name, unless the
+        ``verify-name`` option is set: then we check all sources and warn
+        when they do not agree.
+        """
+        if self.zest_releaser_config.verify_name():
+            names = self.get_names()
+            if len({name for source, name in names}) > 1:
+                logger.warning(
+                    "The package name is not the same everywhere: %s",
+                    ", ".join(f"{name} in {source}" for source, name in names),
+                )
+            if names:
+                return names[0][1]
+            return None
+        for source, getter in self._name_getters():
+            name = getter()
+            if name:
+                logger.debug("Found package name %s in %s.", name, source)
+                return name
+        return None
 
     def _update_version(self, version):
-        """Find out where to change the version and change it.
+        """Change the version where we found it.
 
         There are three places where the version can be defined. The first one
         is an explicitly defined Python file with a ``__version__``
         attribute. The second one is some version.txt that gets read by
         setup.py. The third is directly in setup.py.
-        """
-        if self.get_python_file_version():
-            self._update_python_file_version(version)
-            return
 
-        if self.get_pyproject_toml_version():
-            self._update_pyproject_toml_version(version)
-            return
-
-        version_filenames = ["version"]
-        version_filenames.extend(
-            [".".join(["version", extension]) for extension in TXT_EXTENSIONS]
-        )
-        versionfile = self.filefind(version_filenames)
-        if versionfile:
-            # We have a version.txt file but does it match the setup.py
-            # version (if any)?
-            setup_version = self.get_setup_py_version()
-            if not setup_version or (setup_version == self.get_version_txt_version()):
-                with open(versionfile, "w") as f:
-                    f.write(version + "\n")
-                logger.info("Changed %s to '%s'", versionfile, version)
-                return
-
-        good_version = "version = '%s'" % version
-        line_number = 0
-        setup_lines, encoding = utils.read_text_file(
-            "setup.py",
-        )
-        for line_number, line in enumerate(setup_lines):
-            if VERSION_PATTERN.search(line):
-                logger.debug("Matching version line found: '%s'", line)
-                if line.startswith(" "):
-                    # oh, probably '    version = 1.0,' line.
-                    indentation = line.split("version")[0]
-                    # Note: no spaces around the '='.
-                    good_version = indentation + "version='%s'," % version
-                if '"' in line:
-                    good_version = good_version.replace("'", '"')
-                setup_lines[line_number] = good_version
-                utils.write_text_file("setup.py", "\n".join(setup_lines), encoding)
-                logger.info("Set setup.py's version to '%s'", version)
-                return
-            if UPPERCASE_VERSION_PATTERN.search(line):
-                # This one only occurs in the first column, so no need to
-                # handle indentation.
-                logger.debug("Matching version line found: '%s'", line)
-                good_version = good_version.upper()
-                if '"' in line:
-                    good_version = good_version.replace("'", '"')
-                setup_lines[line_number] = good_version
-                utils.write_text_file("setup.py", "\n".join(setup_lines), encoding)
-                logger.info("Set setup.py's version to '%s'", version)
-                return
-
-        good_version = "version = %s" % version
-        if os.path.exists("setup.cfg"):
-            setup_cfg_lines, encoding = utils.read_text_file(
-                "setup.cfg",
+        Usually we have just read the version, and know where it is.
+        Otherwise we look for it now.
+        """
+        cached = self._cached_version()
+        # Whatever happens, the cached version is no longer valid.
+        self._version_cache = None
+        if cached is not None and cached[1] is not None:
+            location = cached[1]
+        else:
+            location = self._probe_version_location()
+        if location is None:
+            logger.error(
+                "We could read a version, but could not write it back. See "
+                "https://zestreleaser.readthedocs.io/en/latest/versions.html "
+                "for hints."
             )
-            for line_number, line in enumerate(setup_cfg_lines):
-                if VERSION_PATTERN.search(line):
-                    logger.debug("Matching version line found: '%s'", line)
-                    if line.startswith(" "):
-                        indentation = line.split("version")[0]
-
-                        good_version = indentation + good_version
-                    setup_cfg_lines[line_number] = good_version
-                    utils.write_text_file(
-                        "setup.cfg", "\n".join(setup_cfg_lines), encoding
-                    )
-                    logger.info("Set setup.cfg's version to '%s'", version)
-                    return
-
-        logger.error(
-            "We could read a version from setup.py, but could not write it "
-            "back. See "
-            "https://zestreleaser.readthedocs.io/en/latest/versions.html "
-            "for hints."
-        )
-        raise RuntimeError("Cannot set version")
+            raise RuntimeError("Cannot set version")
+        filename = location.filename
+        if location.kind == "version-file":
+            utils.mark_written(filename)
+            with open(filename, "w") as f:
+                f.write(version + "\n")
+            logger.info("Changed %s to '%s'", filename, version)
+            return
+        lines, encoding = utils.read_text_file(filename)
+        lines[location.line_number] = location.version_line(version)
+        if location.kind == "python-file":
+            # The version may be defined more than once, for example in a
+            # try/except.  Change all of them.
+            for line_number, line in enumerate(lines):
+                if UNDERSCORED_VERSION_PATTERN.search(line):
+                    lines[line_number] = VersionLocation.from_line(
+                        filename, location.kind, line_number, line
+                    ).version_line(version)
+        utils.write_text_file(filename, "\n".join(lines), encoding)
+        if location.kind == "python-file":
+            logger.info("Set __version__ in %s to '%s'", filename, version)
+        else:
+            logger.info("Set %s's version to '%s'", filename, version)
 
     version = property(_extract_version, _update_version)
 
@@ -417,36 +656,65 @@ class BaseVersionControl:
         "Name of the project under version control"
         raise NotImplementedError()
 
-    def available_tags(self):
-        """Return available tags."""
+    def available_tags(self, pattern=None):
+        """Return available tags.
+
+        When a glob pattern is given, only return the tags that match it.
+        """
         raise NotImplementedError()
 
+    def nearest_tag(self, pattern="*"):
+        """Return the nearest tag in the history of the current commit.
+
+        Only tags matching the glob pattern count.  Return None when there
+        is no such tag, or when the version control system cannot tell us.
+        """
+        return None
+
     def prepare_checkout_dir(self, prefix):
         """Return a temporary checkout location. Create this directory first
         if necessary."""
         raise NotImplementedError()
 
+    def cleanup_checkout_dir(self, checkout_dir):
+        """Remove the temporary checkout, if that is wanted.
+
+        Return True when we have removed it.  By default we keep it, so you
+        can have a look at it after the release.
+        """
+        return False
+
     def tag_url(self, version):
         "URL to tag of version."
         raise NotImplementedError()
 
-    def cmd_diff(self):
-        "diff command"
+    def cmd_diff(self, paths=None):
+        "diff command, optionally only for these paths"
         raise NotImplementedError()
 
-    def cmd_commit(self, message):
-        "commit command: should specify a verbose option if possible"
+    def cmd_commit(self, message, paths=None):
+        """commit command: should specify a verbose option if possible
+
+        With paths, only commit these files, otherwise all changes.
+        """
         raise NotImplementedError()
 
-    def cmd_diff_last_commit_against_tag(self, version):
+    def cmd_diff_last_commit_against_tag(
+        self, version, stat=False, name_only=False, paths=None
+    ):
         """Return diffs between a tagged version and the last commit of
         the working copy.
+
+        With stat or name_only, only show a summary or the names of the
+        changed files.  With paths, only show changes in these paths.
         """
         raise NotImplementedError()
 
-    def cmd_log_since_tag(self, version):
+    def cmd_log_since_tag(self, version, stat=False, name_only=False, paths=None):
         """Return log since a tagged version till the last commit of
         the working copy.
+
+        The options are the same as for cmd_diff_last_commit_against_tag.
         """
         raise NotImplementedError()
 
@@ -466,11 +734,19 @@ class BaseVersionControl:
         "Is this a clean checkout?"
         raise NotImplementedError()
 
-    def push_commands(self):
+    def push_commands(self, tags=None):
         """Return commands to push changes to the server.
 
-        Needed if a commit isn't enough.
+        Needed if a commit isn't enough.  The tags are the tags that we
+        have just made: when possible, only push these.
+
+        """
+        return []
+
+    def push_fallback_commands(self, tags=None):
+        """Return commands to use instead, when the first push command fails.
 
+        An empty list means: there is no alternative.
         """
         return []
 